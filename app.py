@@ -24,57 +24,233 @@ import os
 import sys
 import time
 import subprocess
+import socket
+import threading
+import uuid
 import csv
 import io
-from io import StringIO
+from itertools import islice
+from operator import itemgetter
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from flask import Flask, flash, request, jsonify, render_template, url_for, redirect, send_from_directory, Response
+from requests.adapters import HTTPAdapter
+from flask import Flask, flash, request, jsonify, render_template, url_for, redirect, send_from_directory, Response, stream_with_context
+from flask import session as flask_session
+from flask import g
 from models import db, Configuration, LeaderboardResult, Session, TrafficSettings, AlgorithmLeaderboardResult
-from sqlalchemy import inspect, and_
+from sqlalchemy import inspect, and_, case, event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
 import json
+import logging
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 app.secret_key = "Group_33" 
 
-db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'traffic_junction.db')
+# Directory containing this file, resolved once at import
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Directory the /frontend route serves the simulation's JavaScript from
+FRONTEND_DIR = os.path.join(BASE_DIR, "frontend")
+
+# Seconds browsers may reuse a frontend file before revalidating it. The file names
+# are not content hashed, so this is kept short rather than marked immutable
+FRONTEND_CACHE_MAX_AGE = 300
+
+# Let a fronting web server such as nginx send files itself when it is configured to
+app.use_x_sendfile = os.environ.get("USE_X_SENDFILE") == "1"
+
+db_path = os.path.join(BASE_DIR, 'traffic_junction.db')
 
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Keep SQLite connections open in a pool rather than reconnecting (and re-running
+# the PRAGMAs below) on every checkout, and wait on a locked database instead of failing
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_size': 5,
+    'max_overflow': 10,
+    # timeout: seconds a connection waits for another connection's lock
+    'connect_args': {'timeout': 5, 'check_same_thread': False},
+}
+
 db.init_app(app)
 
-global_session_id = 0
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection for the many small commits this app makes.
+
+    WAL lets readers continue while a simulation result is written, and
+    synchronous=NORMAL only syncs the log at checkpoints rather than on every commit.
+    temp_store keeps the sorts of the leaderboard queries in memory. How long a
+    writer waits for another connection's lock is set by the 'timeout' connect
+    argument in SQLALCHEMY_ENGINE_OPTIONS.
+    """
+
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-with app.app_context():
+def init_db():
     """
     Initialize database and create all tables.
+
+    Must be called inside an application context.
     """
     
     db.create_all()
 
+    # create_all skips tables that already exist, so add any indexes an older database is missing
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+@app.cli.command("init-db")
+def init_db_command():
+    """
+    Create the database tables and indexes, run once before starting the workers.
+    """
+
+    init_db()
+    print("Database initialised.")
+
+# Importing the app (as every gunicorn worker does) leaves the schema alone
+# unless asked; `flask init-db` and `python app.py` create it explicitly
+if os.environ.get("FLASK_INIT_DB") == "1":
+    with app.app_context():
+        init_db()
+
 server_process = None
 
+# Serialises start_fastapi and stop_fastapi so concurrent requests never spawn
+# a second server or terminate one that is still starting
+server_process_lock = threading.Lock()
+
+# Host and port the FastAPI simulation server listens on
+FASTAPI_ADDRESS = ("127.0.0.1", 8000)
+
+# Base URL of the FastAPI simulation server
+FASTAPI_URL = "http://%s:%d" % FASTAPI_ADDRESS
+
+# Longest time start_fastapi waits for the server to accept connections
+FASTAPI_STARTUP_TIMEOUT = 3.0
+
+# Longest time run_simulation waits for the FastAPI server to finish a simulation
+SIMULATION_TIMEOUT = 60
+
+# Shared HTTP session so calls to the FastAPI server reuse keep-alive connections
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=0))
+
+# Background worker that delivers settings to the FastAPI server off the request thread.
+# A single worker sends them in submission order, so older settings never overwrite newer ones.
+settings_executor = ThreadPoolExecutor(max_workers=1)
+
+# Held while the FastAPI server simulates a run. Its simulator state is shared, so
+# /results, /simulate and /simulate_async all wait here for the run in progress.
+simulation_lock = threading.Lock()
+
+# Background worker that runs simulations submitted to /simulate_async, in submission order
+simulation_executor = ThreadPoolExecutor(max_workers=1)
+
+# Futures of simulations submitted to /simulate_async, keyed by task ID, oldest first
+simulation_tasks = {}
+simulation_tasks_lock = threading.Lock()
+
+# Most finished simulation tasks kept for polling before the oldest are discarded
+SIMULATION_TASK_LIMIT = 100
+
+def orjson_response(*args, **kwargs):
+    """
+    Build a JSON response, serialised with orjson when it is installed.
+
+    Accepts the same arguments as flask.jsonify, and falls back to it when
+    orjson is unavailable or cannot serialise the data.
+
+    Returns:
+        Response: A response with an application/json body.
+    """
+
+    if orjson is None or (args and kwargs):
+        return jsonify(*args, **kwargs)
+
+    data = args[0] if len(args) == 1 else (args or kwargs)
+
+    try:
+        body = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    except TypeError:
+        return jsonify(*args, **kwargs)
+
+    return app.response_class(body, mimetype=app.config["JSONIFY_MIMETYPE"])
+
+def wait_for_fastapi(timeout=FASTAPI_STARTUP_TIMEOUT):
+    """
+    Wait until the FastAPI server accepts TCP connections.
+
+    Args:
+        timeout (float): The longest time to wait, in seconds.
+
+    Returns:
+        bool: True if the server became reachable, False if the timeout expired
+              or the server process exited first.
+    """
+
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if server_process is not None and server_process.poll() is not None:
+            return False
+        try:
+            socket.create_connection(FASTAPI_ADDRESS, timeout=0.1).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+
+    return False
+
 def start_fastapi():
     """
     Start the FastAPI server as a subprocess.
     
-    It provides a small delay to allow the server to initialize.
+    Waits until the server accepts connections, for at most
+    FASTAPI_STARTUP_TIMEOUT seconds, to allow it to initialize.
     
     Global variable 'server_process' is used to track the subprocess.
     """
     
     global server_process
     
-    if server_process is None or server_process.poll() is not None:
-        python_executable = sys.executable
-        # Ensure `server.py` runs in the correct folder
-        server_dir = os.path.join(os.path.dirname(__file__), "backend")
-        server_script = os.path.join(server_dir, "server.py")
-        server_process = subprocess.Popen([python_executable, server_script], cwd=server_dir)
-        time.sleep(3)
-        print("FastAPI server started.")
+    with server_process_lock:
+        if server_process is None or server_process.poll() is not None:
+            python_executable = sys.executable
+            # Ensure `server.py` runs in the correct folder
+            server_dir = os.path.join(BASE_DIR, "backend")
+            server_script = os.path.join(server_dir, "server.py")
+            server_process = subprocess.Popen([python_executable, server_script], cwd=server_dir)
+            if wait_for_fastapi():
+                logger.info("FastAPI server started.")
+            else:
+                logger.warning("FastAPI server did not become ready in time.")
 
 
 def stop_fastapi():
@@ -88,17 +264,18 @@ def stop_fastapi():
     
     global server_process
     
-    if server_process and server_process.poll() is None:  
-    
-        server_process.terminate()
-    
-        try:
-            server_process.wait(timeout=5) 
-        except subprocess.TimeoutExpired:
-            server_process.kill()  
+    with server_process_lock:
+        if server_process and server_process.poll() is None:  
+        
+            server_process.terminate()
+        
+            try:
+                server_process.wait(timeout=5) 
+            except subprocess.TimeoutExpired:
+                server_process.kill()  
 
-        print("FastAPI server stopped.")
-        server_process = None
+            logger.info("FastAPI server stopped.")
+            server_process = None
 
 @app.route('/start_simulation', methods=['POST'])
 def start_simulation():
@@ -110,7 +287,7 @@ def start_simulation():
     
     start_fastapi()
     
-    return jsonify({"message": "FastAPI server started"}), 200
+    return orjson_response({"message": "FastAPI server started"}), 200
 
 @app.route('/stop_simulation', methods=['POST'])
 def stop_simulation():
@@ -122,7 +299,7 @@ def stop_simulation():
     
     stop_fastapi()
     
-    return jsonify({"message": "FastAPI server stopped"}), 200
+    return orjson_response({"message": "FastAPI server stopped"}), 200
 
 @app.route('/back_to_parameters', methods=['GET'])
 def back_to_parameters():
@@ -140,6 +317,9 @@ def back_to_parameters():
 def serve_frontend(filename):
     """
     Serve frontend files from the frontend directory.
+
+    Responses may be cached for FRONTEND_CACHE_MAX_AGE seconds, after which
+    a conditional request is answered with 304 Not Modified if the file is unchanged.
     
     Args:
         filename (str): The name of the file to be served.
@@ -148,9 +328,42 @@ def serve_frontend(filename):
         flask.Response: The requested frontend file.
     """
     
-    frontend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
-    
-    return send_from_directory(frontend_dir, filename)
+    return send_from_directory(FRONTEND_DIR, filename, conditional=True, max_age=FRONTEND_CACHE_MAX_AGE)
+
+# Seconds a cached active session ID is trusted. Each worker process keeps its own
+# cache, so this bounds how long a session created by another worker goes unseen
+ACTIVE_SESSION_CACHE_TTL = 1.0
+
+# (ID of the latest active session, monotonic time it must be looked up again).
+# The pair is replaced in one assignment so concurrent requests never see a mix
+active_session_cache = {"entry": (None, 0.0)}
+
+def reset_active_session_cache():
+    """
+    Discard the cached active session ID so the next lookup queries it again.
+    """
+
+    active_session_cache["entry"] = (None, 0.0)
+
+def get_active_session_id():
+    """
+    Get the ID of the most recent active session.
+
+    The ID is cached for ACTIVE_SESSION_CACHE_TTL seconds and kept up to date by
+    create_session and end_session, so most calls do not touch the database.
+
+    Returns:
+        int or None: The session ID, or None if no session is active.
+    """
+
+    now = time.monotonic()
+    session_id, expires = active_session_cache["entry"]
+    if now >= expires:
+        latest = db.session.query(Session.id).filter_by(active=True).order_by(Session.id.desc()).first()
+        session_id = latest.id if latest else None
+        active_session_cache["entry"] = (session_id, now + ACTIVE_SESSION_CACHE_TTL)
+
+    return session_id
 
 def create_session():
     """
@@ -168,6 +381,9 @@ def create_session():
     db.session.add(session)
     
     db.session.commit()
+
+    # The new session is now the latest active one
+    active_session_cache["entry"] = (session.id, time.monotonic() + ACTIVE_SESSION_CACHE_TTL)
     
     return session.id
 
@@ -179,18 +395,114 @@ def end_session(session_id):
         session_id (int): The ID of the session to be ended.
     """
     
-    session = Session.query.get(session_id)
+    session = db.session.get(Session, session_id)
     
     if session:
         session.active = False
         db.session.commit()
+        reset_active_session_cache()
+
+# Weights applied to (average wait, maximum wait, maximum queue) in every directional score
+SCORE_WEIGHTS = (0.45, 0.2, 0.35)
+
+# Leaderboard result columns in the (direction, metric) order used for batch scoring
+SCORE_METRIC_COLUMNS = tuple(
+    f"{metric}_{direction}"
+    for direction in ("north", "south", "east", "west")
+    for metric in ("avg_wait_time", "max_wait_time", "max_queue_length")
+)
+
+def volume_expression(direction):
+    """
+    Build the SQL sum of a direction's forward, left and right vehicle volumes.
+
+    Args:
+        direction (str): "north", "south", "east" or "west".
+
+    Returns:
+        A SQL expression over Configuration giving the direction's vehicles per hour.
+    """
+
+    return (getattr(Configuration, f"{direction}_forward_vph") +
+            getattr(Configuration, f"{direction}_left_vph") +
+            getattr(Configuration, f"{direction}_right_vph"))
+
+def score_expression(result_model):
+    """
+    Build the SQL equivalent of compute_score_4directions for a leaderboard table.
+
+    The expression reads the metrics from result_model and the vehicle volumes from
+    Configuration, so the query using it must join Configuration on run and session.
+
+    Args:
+        result_model: LeaderboardResult or AlgorithmLeaderboardResult.
+
+    Returns:
+        A SQL expression evaluating to the combined four direction score.
+    """
+
+    avg_weight, max_weight, queue_weight = SCORE_WEIGHTS
+
+    total = None
+
+    for direction in ("north", "south", "east", "west"):
+        volume = volume_expression(direction)
+
+        weighted = (avg_weight * getattr(result_model, f"avg_wait_time_{direction}") +
+                    max_weight * getattr(result_model, f"max_wait_time_{direction}") +
+                    queue_weight * getattr(result_model, f"max_queue_length_{direction}"))
+
+        # Directions with no traffic contribute nothing to the score
+        directional = case((volume == 0, 0.0), else_=weighted / volume)
+
+        total = directional if total is None else total + directional
+
+    return total
+
+def score_difference_expression(result_model, baseline_model):
+    """
+    Build the SQL difference between the scores of two leaderboard tables.
+
+    Equivalent to score_expression(result_model) - score_expression(baseline_model),
+    but each direction's metrics are subtracted before weighting, so its volume is
+    summed and divided by only once.
+
+    Args:
+        result_model: The leaderboard table whose score is subtracted from.
+        baseline_model: The leaderboard table whose score is subtracted.
+
+    Returns:
+        A SQL expression evaluating to the difference of the two scores.
+    """
+
+    avg_weight, max_weight, queue_weight = SCORE_WEIGHTS
+
+    total = None
+
+    for direction in ("north", "south", "east", "west"):
+        volume = volume_expression(direction)
+
+        def metric_difference(metric):
+            return (getattr(result_model, f"{metric}_{direction}") -
+                    getattr(baseline_model, f"{metric}_{direction}"))
+
+        weighted = (avg_weight * metric_difference("avg_wait_time") +
+                    max_weight * metric_difference("max_wait_time") +
+                    queue_weight * metric_difference("max_queue_length"))
+
+        # Directions with no traffic contribute nothing to either score
+        directional = case((volume == 0, 0.0), else_=weighted / volume)
+
+        total = directional if total is None else total + directional
+
+    return total
 
 def get_session_leaderboard(session):
     """
     Get the top 10 leaderboard results for a session based on computed scores.
 
-    Retrieves all leaderboard results for a given session, computes a score for each
-    using compute_score_4directions, sorts them, and returns the top 10.
+    The score, ordering and limit are all evaluated by the database, so only the
+    10 returned results are loaded.
 
     Args:
         session (int): The session ID to filter results.
@@ -198,155 +510,197 @@ def get_session_leaderboard(session):
     Returns:
         list: The top 10 leaderboard results sorted by their calculated score.
     """
-    results = LeaderboardResult.query.filter_by(session_id=session).all()
-    
-    if not results:
-        return []
 
-    for result in results:
+    score = score_expression(LeaderboardResult).label("calculated_score")
 
-        result.calculated_score = compute_score_4directions(
-            result.run_id,
-            result.session_id,
-            result.avg_wait_time_north, result.max_wait_time_north, result.max_queue_length_north,
-            result.avg_wait_time_south, result.max_wait_time_south, result.max_queue_length_south,
-            result.avg_wait_time_east, result.max_wait_time_east, result.max_queue_length_east,
-            result.avg_wait_time_west, result.max_wait_time_west, result.max_queue_length_west,
+    rows = (
+        db.session.query(LeaderboardResult, score)
+        .join(
+            Configuration,
+            and_(
+                Configuration.run_id == LeaderboardResult.run_id,
+                Configuration.session_id == LeaderboardResult.session_id
+            )
         )
+        .filter(LeaderboardResult.session_id == session)
+        .order_by(score, LeaderboardResult.id)
+        .limit(10)
+        .all()
+    )
 
-    sorted_results = sorted(results, key=lambda r: r.calculated_score)
-    
-    return sorted_results[:10]
+    for result, calculated_score in rows:
+        result.calculated_score = calculated_score
+
+    return [result for result, _ in rows]
 
-def save_session_leaderboard_result(run_id, session_id,
-                                  avg_wait_time_n, max_wait_time_n, max_queue_length_n,
-                                  avg_wait_time_s, max_wait_time_s, max_queue_length_s, 
-                                  avg_wait_time_e, max_wait_time_e, max_queue_length_e,
-                                  avg_wait_time_w, max_wait_time_w, max_queue_length_w):
+# Pairs of (metric suffix used by the simulation, column suffix used by the leaderboard tables)
+METRIC_DIRECTIONS = (("n", "north"), ("s", "south"), ("e", "east"), ("w", "west"))
+
+def build_leaderboard_row(run_id, session_id, metrics):
     """
-    Save performance metrics for a specific simulation run to the leaderboard.
-    
+    Build a leaderboard column dictionary from a set of simulation metrics.
+
     Args:
         run_id (int): Unique for the simulation run.
-        session_id (int): ID of the session
-        avg_wait_time_n (float): Average wait time for north-bound traffic.
-        max_wait_time_n (float): Maximum wait time for north-bound traffic.
-        max_queue_length_n (int): Maximum queue length for north-bound traffic.
-        # Similar parameters for south, east, and west directions
+        session_id (int): ID of the session.
+        metrics (dict): Simulation metrics keyed like 'avg_wait_time_n'.
+
+    Returns:
+        dict: Column values for LeaderboardResult or AlgorithmLeaderboardResult.
     """
-    
-    result = LeaderboardResult(
-        session_id=session_id,
-        run_id=run_id,
 
-        avg_wait_time_north=avg_wait_time_n,
-        max_wait_time_north=max_wait_time_n, 
-        max_queue_length_north=max_queue_length_n,
+    row = {"run_id": run_id, "session_id": session_id}
 
-        avg_wait_time_south=avg_wait_time_s,
-        max_wait_time_south=max_wait_time_s,
-        max_queue_length_south=max_queue_length_s,
+    for short, direction in METRIC_DIRECTIONS:
+        row[f"avg_wait_time_{direction}"] = metrics[f"avg_wait_time_{short}"]
+        row[f"max_wait_time_{direction}"] = metrics[f"max_wait_time_{short}"]
+        row[f"max_queue_length_{direction}"] = metrics[f"max_queue_length_{short}"]
 
-        avg_wait_time_east=avg_wait_time_e,
-        max_wait_time_east=max_wait_time_e,
-        max_queue_length_east=max_queue_length_e,
+    return row
 
-        avg_wait_time_west=avg_wait_time_w,
-        max_wait_time_west=max_wait_time_w,
-        max_queue_length_west=max_queue_length_w
-    )
+def save_leaderboard_results_bulk(model, rows):
+    """
+    Insert many leaderboard rows in one statement.
 
-    db.session.add(result)
-    db.session.commit()
+    Executes a Core INSERT on the model's table, as an executemany when several
+    rows are given, so no ORM objects, identity map entries or unit-of-work
+    bookkeeping are involved. The rows are written in the current transaction,
+    which the caller commits.
 
-def save_algorithm_result(run_id, session_id,
-                                    avg_wait_time_n, max_wait_time_n, max_queue_length_n,
-                                    avg_wait_time_s, max_wait_time_s, max_queue_length_s, 
-                                    avg_wait_time_e, max_wait_time_e, max_queue_length_e,
-                                    avg_wait_time_w, max_wait_time_w, max_queue_length_w):
+    Args:
+        model: LeaderboardResult or AlgorithmLeaderboardResult.
+        rows (list): Column dictionaries, as built by build_leaderboard_row.
     """
-    Save algorithm's simulation metrics to the leaderboard.
 
-    Stores the performance metrics from the algorithm's simulation run.
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+def save_session_leaderboard_result(rows):
+    """
+    Save performance metrics for user simulation runs to the leaderboard.
 
     Args:
-        run_id (int): Identifies simulation run
-        session_id (int): Identifies session
-        avg_wait_time_n (float): Average wait time for northbound.
-        max_wait_time_n (float): Maximum wait time for northbound.
-        max_queue_length_n (int): Maximum queue length for northbound.
-        # Similar parameters for south, east, and west directions
+        rows (list): Column dictionaries, as built by build_leaderboard_row.
+    """
 
-    Returns:
-        None.
+    save_leaderboard_results_bulk(LeaderboardResult, rows)
+
+def save_algorithm_result(rows):
+    """
+    Save algorithm's simulation metrics to the leaderboard.
+
+    Args:
+        rows (list): Column dictionaries, as built by build_leaderboard_row.
     """
 
-    result = AlgorithmLeaderboardResult(
-        session_id=session_id,
-        run_id=run_id,
+    save_leaderboard_results_bulk(AlgorithmLeaderboardResult, rows)
+
+# Configuration columns read by get_latest_spawn_rates and get_latest_junction_settings
+LATEST_CONFIGURATION_COLUMNS = (
+    Configuration.lanes, Configuration.left_turn_lane,
+    Configuration.pedestrian_duration, Configuration.pedestrian_frequency,
+    Configuration.north_forward_vph, Configuration.north_left_vph, Configuration.north_right_vph,
+    Configuration.south_forward_vph, Configuration.south_left_vph, Configuration.south_right_vph,
+    Configuration.east_forward_vph, Configuration.east_left_vph, Configuration.east_right_vph,
+    Configuration.west_forward_vph, Configuration.west_left_vph, Configuration.west_right_vph,
+)
+
+# (run_id, column values) of the most recent Configuration, replaced in one
+# assignment so concurrent requests never pair one run's ID with another's values
+latest_config_cache = {"entry": None}
 
-        avg_wait_time_north=avg_wait_time_n,
-        max_wait_time_north=max_wait_time_n, 
-        max_queue_length_north=max_queue_length_n,
+def reset_latest_config_cache():
+    """
+    Discard the cached latest configuration and traffic light settings so the
+    next lookups reload them.
+    """
 
-        avg_wait_time_south=avg_wait_time_s,
-        max_wait_time_south=max_wait_time_s,
-        max_queue_length_south=max_queue_length_s,
+    latest_config_cache["entry"] = None
+    latest_traffic_settings_cache["entry"] = None
 
-        avg_wait_time_east=avg_wait_time_e,
-        max_wait_time_east=max_wait_time_e,
-        max_queue_length_east=max_queue_length_e,
+def get_latest_configuration(latest_run_id=None):
+    """
+    Retrieve the column values of the most recent Configuration.
 
-        avg_wait_time_west=avg_wait_time_w,
-        max_wait_time_west=max_wait_time_w,
-        max_queue_length_west=max_queue_length_w
-    )
+    Only MAX(run_id) is queried on each call; the LATEST_CONFIGURATION_COLUMNS
+    are loaded again only when a newer configuration has been stored since the
+    last lookup.
+
+    Args:
+        latest_run_id (int, optional): MAX(run_id) when the caller has already
+            queried it.
+
+    Returns:
+        dict or None: The latest configuration's column values, or None if no
+                      configuration exists.
+    """
+
+    if latest_run_id is None:
+        latest_run_id = db.session.query(func.max(Configuration.run_id)).scalar()
+
+    if latest_run_id is None:
+        return None
+
+    entry = latest_config_cache["entry"]
+    if entry is None or entry[0] != latest_run_id:
+        latest_config = db.session.query(*LATEST_CONFIGURATION_COLUMNS) \
+            .filter(Configuration.run_id == latest_run_id) \
+            .first()
+        entry = (latest_run_id, latest_config._asdict())
+        latest_config_cache["entry"] = entry
 
-    db.session.add(result)
-    db.session.commit()    
+    return entry[1]
 
-def get_latest_spawn_rates():
+def get_latest_spawn_rates(latest_config=None):
     """
     Retrieve the latest rates for traffic from the most recent inputs.
+
+    Args:
+        latest_config (dict, optional): The latest configuration's column values,
+            when the caller has already loaded them.
     
     Returns:
         dict: A nested dictionary containing rates for each direction 
               and movement type (forward, left, right).
     """
     
-    latest_config = Configuration.query.order_by(Configuration.run_id.desc()).first()
+    if latest_config is None:
+        latest_config = get_latest_configuration()
     
     if not latest_config:
         return {} 
     
     return {
         "north": {
-            "forward": latest_config.north_forward_vph,
-            "left": latest_config.north_left_vph,
-            "right": latest_config.north_right_vph
+            "forward": latest_config["north_forward_vph"],
+            "left": latest_config["north_left_vph"],
+            "right": latest_config["north_right_vph"]
         },
         "south": {
-            "forward": latest_config.south_forward_vph,
-            "left": latest_config.south_left_vph,
-            "right": latest_config.south_right_vph
+            "forward": latest_config["south_forward_vph"],
+            "left": latest_config["south_left_vph"],
+            "right": latest_config["south_right_vph"]
         },
         "east": {
-            "forward": latest_config.east_forward_vph,
-            "left": latest_config.east_left_vph,
-            "right": latest_config.east_right_vph
+            "forward": latest_config["east_forward_vph"],
+            "left": latest_config["east_left_vph"],
+            "right": latest_config["east_right_vph"]
         },
         "west": {
-            "forward": latest_config.west_forward_vph,
-            "left": latest_config.west_left_vph,
-            "right": latest_config.west_right_vph
+            "forward": latest_config["west_forward_vph"],
+            "left": latest_config["west_left_vph"],
+            "right": latest_config["west_right_vph"]
         }
     }
 
 
-def get_latest_junction_settings():
+def get_latest_junction_settings(latest_config=None):
     """
     Retrieve the latest junction configuration settings.
     
+    Args:
+        latest_config (dict, optional): The latest configuration's column values,
+            when the caller has already loaded them.
     
     Returns:
         dict: A dictionary containing junction configuration settings 
@@ -354,15 +708,16 @@ def get_latest_junction_settings():
     """
     try:
 
-        latest_config = Configuration.query.order_by(Configuration.run_id.desc()).first()
+        if latest_config is None:
+            latest_config = get_latest_configuration()
 
         if latest_config:
            
             return {
-                "lanes": latest_config.lanes,
-                "left_turn_lane": latest_config.left_turn_lane,
-                "pedestrian_duration": latest_config.pedestrian_duration,
-                "pedestrian_frequency": latest_config.pedestrian_frequency
+                "lanes": latest_config["lanes"],
+                "left_turn_lane": latest_config["left_turn_lane"],
+                "pedestrian_duration": latest_config["pedestrian_duration"],
+                "pedestrian_frequency": latest_config["pedestrian_frequency"]
             }
         else:
 
@@ -373,7 +728,7 @@ def get_latest_junction_settings():
             }
     except Exception as e:
         
-        print("Error retrieving configuration:", e)
+        logger.warning("Error retrieving configuration: %s", e)
         
         return {
             "lanes": 5,
@@ -381,50 +736,101 @@ def get_latest_junction_settings():
             "pedestrian_frequency": 0
         }
 
-def process_csv(file):
+# Configuration columns expected in an uploaded configuration CSV
+CSV_CONFIGURATION_COLUMNS = (
+    "pedestrian_duration", "pedestrian_frequency",
+    "north_forward_vph", "north_left_vph", "north_right_vph",
+    "south_forward_vph", "south_left_vph", "south_right_vph",
+    "east_forward_vph", "east_left_vph", "east_right_vph",
+    "west_forward_vph", "west_left_vph", "west_right_vph",
+)
+
+# Number of CSV rows sent to the database per executemany batch
+CSV_INSERT_CHUNK_SIZE = 1000
+
+def csv_configuration_rows(reader, session_id):
+    """
+    Convert parsed CSV rows into Configuration column dictionaries.
+
+    The header row is resolved to column positions once, so each data row is
+    read by index rather than through a per-row dictionary.
+
+    Args:
+        reader: An iterator of CSV rows as lists, starting with the header row.
+        session_id (int): The session the configurations belong to.
+
+    Yields:
+        dict: The column dictionary for one CSV row.
+
+    Raises:
+        ValueError: If the header is missing one of CSV_CONFIGURATION_COLUMNS.
+    """
+
+    header = next(reader, None)
+    if header is None:
+        return
+
+    positions = [header.index(column) for column in CSV_CONFIGURATION_COLUMNS]
+
+    for row in reader:
+        # Blank lines, such as a trailing newline, hold no configuration
+        if not row:
+            continue
+
+        config = {column: int(row[position] or 0)
+                  for column, position in zip(CSV_CONFIGURATION_COLUMNS, positions)}
+
+        config["session_id"] = session_id
+
+        for direction in ("north", "south", "east", "west"):
+            config[f"{direction}_vph"] = (config[f"{direction}_forward_vph"] +
+                                          config[f"{direction}_left_vph"] +
+                                          config[f"{direction}_right_vph"])
+
+        yield config
+
+def process_csv(file, session_id):
     """
-    Read a CSV file from the upload and convert each row into a Configuration object
-    which will be added to the database in the future.
+    Read a CSV file from the upload and store every row as a Configuration
+    for the given session.
+
+    The upload is decoded and parsed as a stream, and rows are written in
+    executemany batches of CSV_INSERT_CHUNK_SIZE under a single commit, so
+    memory use does not grow with the size of the file.
 
     Args:
         file: The uploaded file object.
+        session_id (int): The session the configurations belong to.
 
     Returns:
-        list: A list of Configuration objects created from the CSV rows.
+        int: The number of CSV rows inserted.
     """
-    
-    stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-    
-    csv_input = csv.DictReader(stream)
-    
-    configurations = []
-    
-    for row in csv_input:
-    
-        config = Configuration(
-            pedestrian_duration=row['pedestrian_duration'],
-            pedestrian_frequency=row['pedestrian_frequency'],
 
-            north_forward_vph=row['north_forward_vph'],
-            north_left_vph=row['north_left_vph'],
-            north_right_vph=row['north_right_vph'],
+    stream = io.TextIOWrapper(file.stream, encoding="utf-8", newline="")
 
-            south_forward_vph=row['south_forward_vph'],
-            south_left_vph=row['south_left_vph'],
-            south_right_vph=row['south_right_vph'],
+    rows = csv_configuration_rows(csv.reader(stream), session_id)
 
-            east_forward_vph=row['east_forward_vph'],
-            east_left_vph=row['east_left_vph'],
-            east_right_vph=row['east_right_vph'],
+    inserted = 0
 
-            west_forward_vph=row['west_forward_vph'],
-            west_left_vph=row['west_left_vph'],
-            west_right_vph=row['west_right_vph']
-        )
-        
-        configurations.append(config)
-    
-    return configurations
+    try:
+        while True:
+            chunk = list(islice(rows, CSV_INSERT_CHUNK_SIZE))
+            if not chunk:
+                break
+            db.session.execute(Configuration.__table__.insert(), chunk)
+            inserted += len(chunk)
+    except Exception:
+        # Drop the batches already sent so a bad row never leaves a partial import
+        db.session.rollback()
+        raise
+    finally:
+        # Release the upload stream from the wrapper without closing it
+        stream.detach()
+
+    if inserted:
+        db.session.commit()
+
+    return inserted
 
 @app.route('/start_session', methods=['POST'])
 def start_session_api():
@@ -437,7 +843,7 @@ def start_session_api():
     
     session_id = create_session()
     
-    return jsonify({"session_id": session_id, "message": "Session started"})
+    return orjson_response({"session_id": session_id, "message": "Session started"})
 
 @app.route('/end_session', methods=['POST'])
 def end_session_api():
@@ -452,37 +858,75 @@ def end_session_api():
     
     end_session(session_id)
     
-    return jsonify({'message': 'Session ended'})
+    return orjson_response({'message': 'Session ended'})
 
-@app.route('/')
-def index():
+def is_reusable_index_session(session_id):
     """
-    Create a new session and render the index page with the session ID.
+    Check whether the index page can hand out a session again.
+
+    Args:
+        session_id (int or None): The session to check.
 
     Returns:
-        Renders index page.
+        bool: True if the session is still active and has no configurations.
     """
 
-    global global_session_id
-    
-    global_session_id = create_session()
-    
-    return render_template('index.html', session_id=global_session_id)
+    if session_id is None:
+        return False
+
+    return db.session.query(
+        Session.query.filter_by(id=session_id, active=True).exists() &
+        ~Configuration.query.filter_by(session_id=session_id).exists()
+    ).scalar()
+
+def get_or_create_index_session():
+    """
+    Get the session a visit to the index page should use.
+
+    The session remembered in the browser's cookie is reused while it has no
+    configurations, so refreshing the index page does not leave an empty session
+    behind on every request. Otherwise a new session is created, so no two
+    browsers are ever handed the same session.
+
+    Returns:
+        int: The ID of the session to use.
+    """
+
+    session_id = flask_session.get("sid")
+
+    if not is_reusable_index_session(session_id):
+        session_id = create_session()
+
+    flask_session["sid"] = session_id
+
+    return session_id
+
+def get_current_session_id():
+    """
+    Get the session this browser is working in.
 
+    The ID is the one stored in the browser's cookie by the index page, so one
+    visitor's session is not replaced when another browser opens the index page.
+
+    Returns:
+        int: The session ID, or 0 if this browser has not visited the index page.
+    """
+
+    return flask_session.get("sid", 0)
+
+@app.route('/')
 @app.route('/index')
-def indexTwo():
+def index():
     """
-    Starts a session and renders the index page.
+    Start or reuse a session and render the index page with the session ID.
 
     Returns:
         Renders index page.
     """
 
-    global global_session_id
-
-    global_session_id = create_session()
+    session_id = get_or_create_index_session()
     
-    return render_template('index.html', session_id=global_session_id)
+    return render_template('index.html', session_id=session_id)
 
 @app.route('/get_session_run_id', methods=['GET'])
 def get_session_run_id():
@@ -497,24 +941,22 @@ def get_session_run_id():
     
     try:
 
-        session = Session.query.filter_by(active=True).order_by(Session.id.desc()).first()
-        if not session:
+        session_id = get_active_session_id()
+        if session_id is None:
 
-            session = Session(active=True)
-            db.session.add(session)
-            db.session.commit()
+            session_id = create_session()
 
 
-        latest_config = Configuration.query.order_by(Configuration.run_id.desc()).first()
-        run_id = latest_config.run_id if latest_config else 1  # Default to 1 if no configs exist
+        latest_run_id = db.session.query(func.max(Configuration.run_id)).scalar()
+        run_id = latest_run_id if latest_run_id is not None else 1  # Default to 1 if no configs exist
 
-        return jsonify({"session_id": session.id, "run_id": run_id})
+        return orjson_response({"session_id": session_id, "run_id": run_id})
     
     except Exception as e:
         
-        print(f"Error retrieving session and run_id: {e}")
+        logger.error("Error retrieving session and run_id: %s", e)
         
-        return jsonify({"error": str(e)}), 500
+        return orjson_response({"error": str(e)}), 500
 
 
 @app.route('/results')
@@ -532,72 +974,60 @@ def results():
         session_id = request.args.get('session_id', type=int)
 
         if not session_id:
-            if global_session_id == 0:
-                return jsonify({"error": "Missing session_id"}), 400   
-            else:             
-                session_id = global_session_id
+            session_id = get_current_session_id()
+            if session_id == 0:
+                return orjson_response({"error": "Missing session_id"}), 400
 
-        print(session_id)
+        logger.debug("Results requested for session %s", session_id)
 
         run_id = request.args.get('run_id', type=int)
 
         if not run_id:
-            return jsonify({"error": "Missing run_id"}), 400
-
-        with app.test_request_context(
-                '/simulate', 
-                method='POST', 
-                json={'session_id': session_id, 'run_id': run_id}
-            ):
-                response = simulate()
-                if isinstance(response, tuple):
-                    response_data = response[0].json
-                else:
-                    response_data = response.json
-
-                user_metrics = response_data.get('user', {})
-
-                avg_wait_time_n = user_metrics.get('avg_wait_time_n')
-                avg_wait_time_s = user_metrics.get('avg_wait_time_s')
-                avg_wait_time_e = user_metrics.get('avg_wait_time_e')
-                avg_wait_time_w = user_metrics.get('avg_wait_time_w')
-
-                max_wait_time_n = user_metrics.get('max_wait_time_n')
-                max_wait_time_s = user_metrics.get('max_wait_time_s')
-                max_wait_time_e = user_metrics.get('max_wait_time_e')
-                max_wait_time_w = user_metrics.get('max_wait_time_w')
-
-                max_queue_length_n = user_metrics.get('max_queue_length_n')
-                max_queue_length_s = user_metrics.get('max_queue_length_s')
-                max_queue_length_e = user_metrics.get('max_queue_length_e')
-                max_queue_length_w = user_metrics.get('max_queue_length_w')
-
-                score = user_metrics.get('score')
-
-                default_metrics = response_data.get('default', {})
-
-                algorithm_metrics = {
-                    "avg_wait_time_n": default_metrics.get('avg_wait_time_n'),
-                    "avg_wait_time_s": default_metrics.get('avg_wait_time_s'),
-                    "avg_wait_time_e": default_metrics.get('avg_wait_time_e'),
-                    "avg_wait_time_w": default_metrics.get('avg_wait_time_w'),
-
-                    "max_wait_time_n": default_metrics.get('max_wait_time_n'),
-                    "max_wait_time_s": default_metrics.get('max_wait_time_s'),
-                    "max_wait_time_e": default_metrics.get('max_wait_time_e'),
-                    "max_wait_time_w": default_metrics.get('max_wait_time_w'),
-
-                    "max_queue_length_n": default_metrics.get('max_queue_length_n'),
-                    "max_queue_length_s": default_metrics.get('max_queue_length_s'),
-                    "max_queue_length_e": default_metrics.get('max_queue_length_e'),
-                    "max_queue_length_w": default_metrics.get('max_queue_length_w'),
-
-                    "score": default_metrics.get('score')
-                }
+            return orjson_response({"error": "Missing run_id"}), 400
+
+        response_data = run_simulation(session_id, run_id)
+
+        user_metrics = response_data.get('user', {})
+
+        avg_wait_time_n = user_metrics.get('avg_wait_time_n')
+        avg_wait_time_s = user_metrics.get('avg_wait_time_s')
+        avg_wait_time_e = user_metrics.get('avg_wait_time_e')
+        avg_wait_time_w = user_metrics.get('avg_wait_time_w')
+
+        max_wait_time_n = user_metrics.get('max_wait_time_n')
+        max_wait_time_s = user_metrics.get('max_wait_time_s')
+        max_wait_time_e = user_metrics.get('max_wait_time_e')
+        max_wait_time_w = user_metrics.get('max_wait_time_w')
+
+        max_queue_length_n = user_metrics.get('max_queue_length_n')
+        max_queue_length_s = user_metrics.get('max_queue_length_s')
+        max_queue_length_e = user_metrics.get('max_queue_length_e')
+        max_queue_length_w = user_metrics.get('max_queue_length_w')
 
-        spawn_rates = get_latest_spawn_rates()
-        junction_settings = get_latest_junction_settings()
-        traffic_light_settings = get_latest_traffic_light_settings()
+        score = user_metrics.get('score')
+
+        default_metrics = response_data.get('default', {})
+
+        algorithm_metrics = {
+            "avg_wait_time_n": default_metrics.get('avg_wait_time_n'),
+            "avg_wait_time_s": default_metrics.get('avg_wait_time_s'),
+            "avg_wait_time_e": default_metrics.get('avg_wait_time_e'),
+            "avg_wait_time_w": default_metrics.get('avg_wait_time_w'),
+
+            "max_wait_time_n": default_metrics.get('max_wait_time_n'),
+            "max_wait_time_s": default_metrics.get('max_wait_time_s'),
+            "max_wait_time_e": default_metrics.get('max_wait_time_e'),
+            "max_wait_time_w": default_metrics.get('max_wait_time_w'),
+
+            "max_queue_length_n": default_metrics.get('max_queue_length_n'),
+            "max_queue_length_s": default_metrics.get('max_queue_length_s'),
+            "max_queue_length_e": default_metrics.get('max_queue_length_e'),
+            "max_queue_length_w": default_metrics.get('max_queue_length_w'),
+
+            "score": default_metrics.get('score')
+        }
+
+        spawn_rates, junction_settings, traffic_light_settings = get_latest_settings()
 
         return render_template(
             'results.html',
@@ -623,8 +1053,9 @@ def results():
         )
 
     except Exception as e:        
-        print(f"Error: {e}")
-        return jsonify({'error': str(e)}), 400
+        db.session.rollback()
+        logger.error("Error producing results: %s", e)
+        return orjson_response({'error': str(e)}), 400
     
 @app.route('/back_to_results')
 def back_to_results():
@@ -642,7 +1073,7 @@ def back_to_results():
             run_id = latest_config.run_id
             session_id = latest_config.session_id
         else:
-            return jsonify({"error": "Missing run_id"}), 400
+            return orjson_response({"error": "Missing run_id"}), 400
 
         configuration = Configuration.query.filter_by(session_id=session_id).first()
 
@@ -830,20 +1261,41 @@ def back_to_results():
         )
 
     except Exception as e:        
-        print(f"Error: {e}")
-        return jsonify({'error': str(e)}), 400    
+        logger.error("Error returning to results: %s", e)
+        return orjson_response({'error': str(e)}), 400    
+
+# Columns returned by get_latest_traffic_light_settings
+LATEST_TRAFFIC_SETTINGS_COLUMNS = (
+    TrafficSettings.enabled,
+    TrafficSettings.sequences_per_hour,
+    TrafficSettings.vertical_main_green,
+    TrafficSettings.horizontal_main_green,
+    TrafficSettings.vertical_right_green,
+    TrafficSettings.horizontal_right_green,
+)
+
+# (id, column values) of the most recent TrafficSettings, replaced in one assignment
+latest_traffic_settings_cache = {"entry": None}
 
-def get_latest_traffic_light_settings():
+def get_latest_traffic_light_settings(latest_id=None):
     """
     Get the most recent traffic light settings or default values if none exist.
 
+    Only MAX(id) is queried on each call; the settings are loaded again only
+    when newer traffic settings have been stored since the last lookup.
+
+    Args:
+        latest_id (int, optional): MAX(TrafficSettings.id) when the caller has
+            already queried it.
+
     Returns:
         dict: A dictionary with the latest traffic light configuration.
     """
     
-    latest_ts = TrafficSettings.query.order_by(TrafficSettings.id.desc()).first()
+    if latest_id is None:
+        latest_id = db.session.query(func.max(TrafficSettings.id)).scalar()
 
-    if not latest_ts:
+    if latest_id is None:
 
         return {
             "enabled": False,
@@ -854,30 +1306,164 @@ def get_latest_traffic_light_settings():
             "horizontal_right_green": 0,
         }
 
-    return {
-        "enabled": latest_ts.enabled,
-        "sequences_per_hour": latest_ts.sequences_per_hour,
-        "vertical_main_green": latest_ts.vertical_main_green,
-        "horizontal_main_green": latest_ts.horizontal_main_green,
-        "vertical_right_green": latest_ts.vertical_right_green,
-        "horizontal_right_green": latest_ts.horizontal_right_green,
-    }
+    entry = latest_traffic_settings_cache["entry"]
+    if entry is None or entry[0] != latest_id:
+        latest_ts = db.session.query(*LATEST_TRAFFIC_SETTINGS_COLUMNS) \
+            .filter(TrafficSettings.id == latest_id) \
+            .first()
+        entry = (latest_id, latest_ts._asdict())
+        latest_traffic_settings_cache["entry"] = entry
 
-def get_session_leaderboard_result(session_id, run_id):
+    # Callers may add to the settings, so hand each one its own copy
+    return dict(entry[1])
+
+def get_latest_settings():
     """
-    Fetch the leaderboard result for a given session and run.
+    Retrieve the latest spawn rates, junction settings and traffic light settings.
 
-    Args:
-        session_id (int): The session identifier.
-        run_id (int): The run identifier.
+    The newest Configuration run_id and TrafficSettings id are read in a single
+    query, and the cached settings are reused unless either has changed.
 
     Returns:
-        LeaderboardResult: The leaderboard result object or None.
+        tuple: The spawn rates, junction settings and traffic light settings dictionaries.
     """
-    
-    return LeaderboardResult.query.filter_by(session_id=session_id, run_id=run_id).first()
 
-@app.route('/parameters', methods=['GET', 'POST'])
+    latest_run_id, latest_ts_id = db.session.query(
+        func.max(Configuration.run_id),
+        db.session.query(func.max(TrafficSettings.id)).scalar_subquery()
+    ).one()
+
+    latest_config = get_latest_configuration(latest_run_id) if latest_run_id is not None else {}
+
+    return (
+        get_latest_spawn_rates(latest_config),
+        get_latest_junction_settings(latest_config),
+        get_latest_traffic_light_settings(latest_ts_id),
+    )
+
+def get_session_leaderboard_result(session_id, run_id):
+    """
+    Fetch the leaderboard result for a given session and run.
+
+    Args:
+        session_id (int): The session identifier.
+        run_id (int): The run identifier.
+
+    Returns:
+        LeaderboardResult: The leaderboard result object or None.
+    """
+    
+    return LeaderboardResult.query.filter_by(session_id=session_id, run_id=run_id).first()
+
+def send_settings_to_server(spawn_rates, junction_settings, traffic_light_settings):
+    """
+    Send spawn rates, junction settings and traffic light settings to the
+    FastAPI server in a single request.
+
+    Args:
+        spawn_rates (dict): Vehicle rates for each direction and movement.
+        junction_settings (dict): Lanes and pedestrian settings.
+        traffic_light_settings (dict): User traffic light timings.
+    """
+
+    payload = {
+        "spawn_rates": spawn_rates,
+        "junction_settings": junction_settings,
+        "traffic_light_settings": traffic_light_settings
+    }
+
+    # Encode with orjson when available; requests would otherwise use the stdlib json module
+    if orjson is not None:
+        request_kwargs = {"data": orjson.dumps(payload), "headers": {"Content-Type": "application/json"}}
+    else:
+        request_kwargs = {"json": payload}
+
+    try:
+        response = http_session.post(f"{FASTAPI_URL}/update_all_settings", timeout=2, **request_kwargs)
+        if response.status_code == 200:
+            logger.debug("Settings sent successfully to server.py.")
+        else:
+            logger.warning("Error sending settings: %s", response.text)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Could not reach server.py: %s", e)
+
+def log_settings_failure(future):
+    """
+    Report an unexpected error raised while sending settings in the background.
+
+    Args:
+        future (Future): The completed send_settings_to_server call.
+    """
+
+    error = future.exception()
+
+    if error:
+        logger.warning("Could not send settings to server.py: %s", error)
+
+def dispatch_settings_to_server(spawn_rates, junction_settings, traffic_light_settings):
+    """
+    Queue the settings for the FastAPI server without waiting for the response,
+    so the calling request can return immediately.
+
+    Args:
+        spawn_rates (dict): Vehicle rates for each direction and movement.
+        junction_settings (dict): Lanes and pedestrian settings.
+        traffic_light_settings (dict): User traffic light timings.
+    """
+
+    future = settings_executor.submit(send_settings_to_server, spawn_rates, junction_settings, traffic_light_settings)
+
+    future.add_done_callback(log_settings_failure)
+
+def safe_int(value, _int=int):
+    """
+    Convert a submitted form or JSON value to an integer.
+
+    Args:
+        value: The raw value, typically a string from the request.
+
+    Returns:
+        int: The parsed integer, or 0 if the value is missing or not an integer.
+    """
+
+    # Uploaded JSON already holds ints, which need no conversion
+    if type(value) is _int:
+        return value
+
+    try:
+        return _int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def non_negative_int(value):
+    """
+    Convert a submitted vehicle rate, count or timing to an integer of at least 0.
+
+    Negative rates would cancel out a direction's other movements and corrupt its
+    score, so they are stored as 0.
+
+    Args:
+        value: The raw value, typically a string from the request.
+
+    Returns:
+        int: The parsed integer, or 0 if it is negative, missing or not an integer.
+    """
+
+    return max(0, safe_int(value))
+
+# Form field prefix used by the parameters page for each direction
+FORM_DIRECTION_PREFIXES = (
+    ("north", "nb"), ("south", "sb"), ("east", "eb"), ("west", "wb"),
+)
+
+# Spawn rate fields the parameters form must supply, checked before anything is stored
+PARAMETER_REQUIRED_FIELDS = tuple(
+    f"{prefix}_{movement}"
+    for _, prefix in FORM_DIRECTION_PREFIXES
+    for movement in ("forward", "left", "right")
+)
+
+@app.route('/parameters', methods=['GET', 'POST'])
 def parameters():
     """
     Handles manual parameter submission.
@@ -886,72 +1472,51 @@ def parameters():
     to the FastAPI server. On GET, it renders the parameters page.
     """
     if request.method == 'POST':
-        print("Received Form Data:", request.form)
         try:
             data = request.form
-            print("Received Form Data:", data)
+            logger.debug("Received form data: %s", data)
 
-            required_fields = [
-                'nb_forward', 'nb_left', 'nb_right',
-                'sb_forward', 'sb_left', 'sb_right',
-                'eb_forward', 'eb_left', 'eb_right',
-                'wb_forward', 'wb_left', 'wb_right'
-            ]
-
-            for field in required_fields:
+            for field in PARAMETER_REQUIRED_FIELDS:
                 if field not in data or not data[field].strip():
 
                     return redirect(url_for('error', message=f"Missing required field: {field}"))
 
-            session = Session.query.get(global_session_id)
+            session_id = get_current_session_id()
+            session = db.session.get(Session, session_id)
 
-            print(global_session_id)
+            logger.debug("Storing parameters for session %s", session_id)
 
-            def safe_int(value):
-                try:
-                    val = str(value).strip()
-                    return int(val) if val.isdigit() else 0
-                except Exception:
-                    return 0
+            # Parse each direction's rates once; they feed both the stored
+            # configuration and the settings sent to FastAPI
+            spawn_rates = {
+                direction: {
+                    movement: non_negative_int(data[f"{prefix}_{movement}"])
+                    for movement in ("forward", "left", "right")
+                }
+                for direction, prefix in FORM_DIRECTION_PREFIXES
+            }
 
-            north_vph = safe_int(data.get('nb_forward', 0)) + safe_int(data.get('nb_left', 0)) + safe_int(data.get('nb_right', 0))
-            south_vph = safe_int(data.get('sb_forward', 0)) + safe_int(data.get('sb_left', 0)) + safe_int(data.get('sb_right', 0))
-            east_vph  = safe_int(data.get('eb_forward', 0)) + safe_int(data.get('eb_left', 0)) + safe_int(data.get('eb_right', 0))
-            west_vph  = safe_int(data.get('wb_forward', 0)) + safe_int(data.get('wb_left', 0)) + safe_int(data.get('wb_right', 0))
+            volume_columns = {}
+            for direction, rates in spawn_rates.items():
+                volume_columns[f"{direction}_vph"] = sum(rates.values())
+                for movement, rate in rates.items():
+                    volume_columns[f"{direction}_{movement}_vph"] = rate
 
-            pedestrian_duration = safe_int(data.get('pedestrian-duration', 0))
-            pedestrian_frequency = safe_int(data.get('pedestrian-frequency', 0))
+            lanes = non_negative_int(data.get('lanes', 5))
+            pedestrian_duration = non_negative_int(data.get('pedestrian-duration', 0))
+            pedestrian_frequency = non_negative_int(data.get('pedestrian-frequency', 0))
 
             # Create and store the configuration
             config = Configuration(
                 session_id=session.id,
-                lanes=safe_int(data.get('lanes', 5)),
+                lanes=lanes,
                 pedestrian_duration=pedestrian_duration,
                 pedestrian_frequency=pedestrian_frequency,
-
-                north_vph=north_vph,
-                north_forward_vph=safe_int(data.get('nb_forward', 0)),
-                north_left_vph=safe_int(data.get('nb_left', 0)),
-                north_right_vph=safe_int(data.get('nb_right', 0)),
-
-                south_vph=south_vph,
-                south_forward_vph=safe_int(data.get('sb_forward', 0)),
-                south_left_vph=safe_int(data.get('sb_left', 0)),
-                south_right_vph=safe_int(data.get('sb_right', 0)),
-
-                east_vph=east_vph,
-                east_forward_vph=safe_int(data.get('eb_forward', 0)),
-                east_left_vph=safe_int(data.get('eb_left', 0)),
-                east_right_vph=safe_int(data.get('eb_right', 0)),
-
-                west_vph=west_vph,
-                west_forward_vph=safe_int(data.get('wb_forward', 0)),
-                west_left_vph=safe_int(data.get('wb_left', 0)),
-                west_right_vph=safe_int(data.get('wb_right', 0))
+                **volume_columns
             )
             db.session.add(config)
-            db.session.commit()
-            print(f"Data stored with run_id {config.run_id}")
+            # Flush assigns config.run_id without ending the transaction
+            db.session.flush()
 
             # Process traffic light settings based on checkbox state
             traffic_enabled = data.get('traffic-light-enable', '') == 'on'
@@ -960,11 +1525,11 @@ def parameters():
                     run_id=config.run_id,
                     session_id=session.id,
                     enabled=True,
-                    sequences_per_hour=safe_int(data.get('tl_sequences', 0)),
-                    vertical_main_green=safe_int(data.get('tl_vmain', 0)),
-                    horizontal_main_green=safe_int(data.get('tl_hmain', 0)),
-                    vertical_right_green=safe_int(data.get('tl_vright', 0)),
-                    horizontal_right_green=safe_int(data.get('tl_hright', 0))
+                    sequences_per_hour=non_negative_int(data.get('tl_sequences', 0)),
+                    vertical_main_green=non_negative_int(data.get('tl_vmain', 0)),
+                    horizontal_main_green=non_negative_int(data.get('tl_hmain', 0)),
+                    vertical_right_green=non_negative_int(data.get('tl_vright', 0)),
+                    horizontal_right_green=non_negative_int(data.get('tl_hright', 0))
                 )
             else:
                 tl_config = TrafficSettings(
@@ -979,54 +1544,17 @@ def parameters():
                 )
             db.session.add(tl_config)
             db.session.commit()
-            print(f"Traffic settings stored for run_id {config.run_id}")
-
-            # Build spawn rates dictionary to send to FastAPI
-            spawn_rates = {
-                "north": {
-                    "forward": safe_int(data.get('nb_forward', 0)),
-                    "left": safe_int(data.get('nb_left', 0)),
-                    "right": safe_int(data.get('nb_right', 0))
-                },
-                "south": {
-                    "forward": safe_int(data.get('sb_forward', 0)),
-                    "left": safe_int(data.get('sb_left', 0)),
-                    "right": safe_int(data.get('sb_right', 0))
-                },
-                "east": {
-                    "forward": safe_int(data.get('eb_forward', 0)),
-                    "left": safe_int(data.get('eb_left', 0)),
-                    "right": safe_int(data.get('eb_right', 0))
-                },
-                "west": {
-                    "forward": safe_int(data.get('wb_forward', 0)),
-                    "left": safe_int(data.get('wb_left', 0)),
-                    "right": safe_int(data.get('wb_right', 0))
-                }
-            }
-            try:
-                response = requests.post("http://127.0.0.1:8000/update_spawn_rates", json=spawn_rates)
-                if response.status_code == 200:
-                    print("Spawn rates sent successfully to server.py.")
-            except requests.exceptions.RequestException as e:
-                print(f"Could not reach server.py: {e}")
+            reset_latest_config_cache()
+            logger.info("Configuration and traffic settings stored with run_id %s", config.run_id)
 
-            # Build and send junction settings dictionary
+            # Build junction settings dictionary
             junction_settings = {
-                "lanes": safe_int(data.get('lanes', 5)),
+                "lanes": lanes,
                 "pedestrian_duration": pedestrian_duration,
                 "pedestrian_frequency": pedestrian_frequency,
             }
-            try:
-                response = requests.post("http://127.0.0.1:8000/update_junction_settings", json=junction_settings)
-                if response.status_code == 200:
-                    print("Junction settings sent successfully to server.py.")
-                else:
-                    print(f"Error sending junction settings: {response.text}")
-            except requests.exceptions.RequestException as e:
-                print(f"Could not reach server.py: {e}")
-
-            # Build and send traffic light settings dictionary
+
+            # Build traffic light settings dictionary
             traffic_light_settings = {
                 "traffic-light-enable": "on" if traffic_enabled else "",
                 "sequences": tl_config.sequences_per_hour,
@@ -1035,20 +1563,14 @@ def parameters():
                 "vertical_right_green": tl_config.vertical_right_green,
                 "horizontal_right_green": tl_config.horizontal_right_green
             }
-            try:
-                response = requests.post("http://127.0.0.1:8000/update_traffic_light_settings", json=traffic_light_settings)
-                if response.status_code == 200:
-                    print("Traffic light settings sent successfully to server.py.")
-                else:
-                    print(f"Error sending traffic light settings: {response.text}")
-            except requests.exceptions.RequestException as e:
-                print(f"Could not reach server.py for traffic lights: {e}")
+
+            dispatch_settings_to_server(spawn_rates, junction_settings, traffic_light_settings)
 
             return redirect(url_for('junctionPage'))
         except Exception as e:
             db.session.rollback()
-            print(f"Error: {e}")
-            return jsonify({'error': str(e)}), 400
+            logger.error("Error storing parameters: %s", e)
+            return orjson_response({'error': str(e)}), 400
 
     return render_template('parameters.html')
 
@@ -1066,10 +1588,10 @@ def junction_settings_proxy():
     """
     
     try:
-        resp = requests.get("http://127.0.0.1:8000/junction_settings")
-        return jsonify(resp.json())
+        resp = http_session.get(f"{FASTAPI_URL}/junction_settings", timeout=2)
+        return orjson_response(resp.json())
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return orjson_response({"error": str(e)}), 500
 
 @app.route('/upload-file', methods=['POST'])
 def uploadfile():
@@ -1089,6 +1611,127 @@ def uploadfile():
 
     return f"File '{file.filename}' uploaded successfully!"
 
+# Integer settings read from an uploaded JSON or CSV file, by their form field name
+UPLOAD_INT_KEYS = (
+    'nb_forward', 'nb_left', 'nb_right',
+    'sb_forward', 'sb_left', 'sb_right',
+    'eb_forward', 'eb_left', 'eb_right',
+    'wb_forward', 'wb_left', 'wb_right',
+    'lanes', 'pedestrian-duration', 'pedestrian-frequency',
+    'tl_sequences', 'tl_vmain', 'tl_hmain', 'tl_vright', 'tl_hright',
+)
+
+# Where each integer setting sits in an uploaded JSON file: (setting, key path, default)
+UPLOAD_JSON_FIELDS = tuple(
+    (f"{prefix}_{movement}", ("vehicle_settings", direction, json_key), 0)
+    for direction, prefix in FORM_DIRECTION_PREFIXES
+    for movement, json_key in (("forward", "forward"), ("left", "turning_left"), ("right", "turning_right"))
+) + (
+    ('lanes', ("junction_settings", "number_of_lanes"), 5),
+    ('pedestrian-duration', ("junction_settings", "pedestrian_duration"), 0),
+    ('pedestrian-frequency', ("junction_settings", "pedestrian_frequency"), 0),
+    ('tl_sequences', ("traffic_light_settings", "traffic_cycles"), 0),
+    ('tl_vmain', ("traffic_light_settings", "vertical_sequence", "main_green_length"), 0),
+    ('tl_vright', ("traffic_light_settings", "vertical_sequence", "right_green_length"), 0),
+    ('tl_hmain', ("traffic_light_settings", "horizontal_sequence", "main_green_length"), 0),
+    ('tl_hright', ("traffic_light_settings", "horizontal_sequence", "right_green_length"), 0),
+)
+
+def lookup_json_path(document, path, default):
+    """
+    Follow a path of keys through nested JSON objects.
+
+    Args:
+        document (dict): The decoded JSON document.
+        path (tuple): The keys to follow, outermost first.
+        default: The value used when a key is missing or null.
+
+    Returns:
+        The value at the end of the path, or default.
+
+    Raises:
+        ValueError: If a value along the path is present but is not an object.
+    """
+
+    value = document
+    for key in path:
+        if value is None:
+            return default
+        if not isinstance(value, dict):
+            raise ValueError(f"Expected a JSON object before '{key}'")
+        value = value.get(key)
+    return default if value is None else value
+
+def parse_upload_json(json_data):
+    """
+    Parse the settings of an uploaded JSON file.
+
+    Args:
+        json_data (dict): The decoded JSON document.
+
+    Returns:
+        tuple: A dict of integer settings keyed as in UPLOAD_INT_KEYS, and
+            whether the user's traffic light settings are enabled.
+
+    Raises:
+        ValueError: If the document, or a section of it, is not a JSON object.
+    """
+
+    if not isinstance(json_data, dict):
+        raise ValueError("Expected a JSON object")
+
+    values = {
+        key: non_negative_int(lookup_json_path(json_data, path, default))
+        for key, path, default in UPLOAD_JSON_FIELDS
+    }
+
+    traffic_enabled = lookup_json_path(json_data, ("traffic_light_settings", "enabled"), False)
+
+    return values, bool(traffic_enabled)
+
+# Where each integer setting sits in an uploaded CSV file: (setting, column, default)
+UPLOAD_CSV_FIELDS = tuple(
+    (f"{prefix}_{movement}", f"{direction}_{column}", 0)
+    for direction, prefix in FORM_DIRECTION_PREFIXES
+    for movement, column in (("forward", "forward"), ("left", "tleft"), ("right", "tright"))
+) + (
+    ('lanes', "number_of_lanes", 5),
+    ('pedestrian-frequency', "pedestrian_frequency", 0),
+    ('pedestrian-duration', "pedestrian_duration", 0),
+    ('tl_sequences', "traffic_cycles", 0),
+    ('tl_vmain', "vertical_sequence_main_green_length", 0),
+    ('tl_vright', "vertical_sequence_right_green_length", 0),
+    ('tl_hmain', "horizontal_sequence_main_green_length", 0),
+    ('tl_hright', "horizontal_sequence_right_green_length", 0),
+)
+
+def parse_upload_csv(stream):
+    """
+    Parse the settings of an uploaded CSV file.
+
+    Only the first non-empty data row is read; each column is looked up by its header.
+
+    Args:
+        stream: A text stream over the CSV file.
+
+    Returns:
+        tuple: A dict of integer settings keyed as in UPLOAD_INT_KEYS, and
+            whether the user's traffic light settings are enabled.
+    """
+
+    csv_reader = csv.reader(stream)
+    header = next(csv_reader)
+    # Assuming a single row of data; blank lines before it are skipped
+    row = next(row for row in csv_reader if row)
+
+    # Pair each header with its cell once; missing trailing cells are left out
+    cells = dict(zip(header, row))
+    cell = cells.get
+
+    values = {key: non_negative_int(cell(column, default)) for key, column, default in UPLOAD_CSV_FIELDS}
+
+    return values, cell("enable_traffic_light_settings", "").lower() == "true"
+
 @app.route('/upload', methods=['POST'])
 def upload():
     """
@@ -1113,268 +1756,203 @@ def upload():
     if ext not in ['.json', '.csv']:
         return "Invalid file type", 400
 
-    data = {}
     try:
         if ext == '.json':
             # Reset pointer to the start, read once, and reuse the content
             file.seek(0)
             raw_bytes = file.read()
-            print("Raw file bytes:", raw_bytes)
-            file_content = raw_bytes.decode('utf-8')
-            print("Raw file content:", file_content)
-            json_data = json.loads(file_content)
-            print("Parsed JSON data:", json_data)
-            
-            # Map JSON vehicle settings to expected keys
-            vehicle = json_data.get("vehicle_settings", {})
-            north = vehicle.get("north", {})
-            east = vehicle.get("east", {})
-            south = vehicle.get("south", {})
-            west = vehicle.get("west", {})
-
-            data['nb_forward'] = north.get("forward", 0)
-            data['nb_left'] = north.get("turning_left", 0)
-            data['nb_right'] = north.get("turning_right", 0)
-
-            data['eb_forward'] = east.get("forward", 0)
-            data['eb_left'] = east.get("turning_left", 0)
-            data['eb_right'] = east.get("turning_right", 0)
-
-            data['sb_forward'] = south.get("forward", 0)
-            data['sb_left'] = south.get("turning_left", 0)
-            data['sb_right'] = south.get("turning_right", 0)
-
-            data['wb_forward'] = west.get("forward", 0)
-            data['wb_left'] = west.get("turning_left", 0)
-            data['wb_right'] = west.get("turning_right", 0)
-
-            # Map JSON junction settings
-            junction = json_data.get("junction_settings", {})
-            data['lanes'] = junction.get("number_of_lanes", 5)
-            data['pedestrian-duration'] = junction.get("pedestrian_duration", 0)
-            data['pedestrian-frequency'] = junction.get("pedestrian_frequency", 0)
-
-            # Map JSON traffic light settings
-            tls = json_data.get("traffic_light_settings", {})
-            if tls.get("enabled", False):
-                data['traffic-light-enable'] = 'on'
-            else:
-                data['traffic-light-enable'] = ''
-            data['tl_sequences'] = tls.get("traffic_cycles", 0)
-            vertical_seq = tls.get("vertical_sequence", {})
-            horizontal_seq = tls.get("horizontal_sequence", {})
-            data['tl_vmain'] = vertical_seq.get("main_green_length", 0)
-            data['tl_vright'] = vertical_seq.get("right_green_length", 0)
-            data['tl_hmain'] = horizontal_seq.get("main_green_length", 0)
-            data['tl_hright'] = horizontal_seq.get("right_green_length") or 0
+            logger.debug("Raw file content: %r", raw_bytes)
+            json_data = orjson.loads(raw_bytes) if orjson is not None else json.loads(raw_bytes)
+            logger.debug("Parsed JSON data: %s", json_data)
+            values, traffic_enabled = parse_upload_json(json_data)
 
         elif ext == '.csv':
-            # CSV branch remains unchanged
             file.seek(0)
-            file_content = file.read().decode('utf-8')
-            csv_reader = csv.DictReader(StringIO(file_content))
-            row = next(csv_reader)  # Assuming a single row of data
-
-            data['nb_forward'] = row.get("north_forward", 0)
-            data['nb_left'] = row.get("north_tleft", 0)
-            data['nb_right'] = row.get("north_tright", 0)
-
-            data['eb_forward'] = row.get("east_forward", 0)
-            data['eb_left'] = row.get("east_tleft", 0)
-            data['eb_right'] = row.get("east_tright", 0)
-
-            data['sb_forward'] = row.get("south_forward", 0)
-            data['sb_left'] = row.get("south_tleft", 0)
-            data['sb_right'] = row.get("south_tright", 0)
-
-            data['wb_forward'] = row.get("west_forward", 0)
-            data['wb_left'] = row.get("west_tleft", 0)
-            data['wb_right'] = row.get("west_tright", 0)
-
-            data['lanes'] = row.get("number_of_lanes", 5)
-            data['pedestrian-frequency'] = row.get("pedestrian_frequency", 0)
-            data['pedestrian-duration'] = row.get("pedestrian_duration", 0)
-
-            if row.get("enable_traffic_light_settings", "").lower() == "true":
-                data['traffic-light-enable'] = 'on'
-            else:
-                data['traffic-light-enable'] = ''
-            data['tl_sequences'] = row.get("traffic_cycles", 0)
-            data['tl_vmain'] = row.get("vertical_sequence_main_green_length", 0)
-            data['tl_vright'] = row.get("vertical_sequence_right_green_length", 0)
-            data['tl_hmain'] = row.get("horizontal_sequence_main_green_length", 0)
-            data['tl_hright'] = row.get("horizontal_sequence_right_green_length", 0)
+            # Decode the upload as it is read rather than copying it into a string first
+            stream = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+            try:
+                values, traffic_enabled = parse_upload_csv(stream)
+            finally:
+                # Release the upload stream from the wrapper without closing it
+                stream.detach()
     except Exception as e:
-        print("Error parsing file:", e)
+        logger.warning("Error parsing file: %s", e)
         # Instead of rendering a missing template, just return a string error
         return "Error parsing file", 400
 
-    print("Parsed file data:", data)
+    logger.debug("Parsed file data: %s (traffic lights enabled: %s)", values, traffic_enabled)
 
     try:
         # Find or create a session
-        session_obj = Session.query.get(global_session_id)
+        session_obj = db.session.get(Session, get_current_session_id())
         if not session_obj:
             return "Session not found", 400
 
-        def safe_int(value):
-            try:
-                if isinstance(value, str):
-                    val = value.strip()
-                    return int(val) if val.isdigit() else 0
-                return int(value)
-            except:
-                return 0
-
-        # Calculate VPH totals for each direction
-        north_vph = safe_int(data.get('nb_forward')) + safe_int(data.get('nb_left')) + safe_int(data.get('nb_right'))
-        south_vph = safe_int(data.get('sb_forward')) + safe_int(data.get('sb_left')) + safe_int(data.get('sb_right'))
-        east_vph  = safe_int(data.get('eb_forward')) + safe_int(data.get('eb_left')) + safe_int(data.get('eb_right'))
-        west_vph  = safe_int(data.get('wb_forward')) + safe_int(data.get('wb_left')) + safe_int(data.get('wb_right'))
-
-        # Store user input in the database (Configuration)
-        config = Configuration(
-            session_id=session_obj.id,
-            lanes=safe_int(data.get('lanes', 5)),
-            pedestrian_duration=safe_int(data.get('pedestrian-duration')),
-            pedestrian_frequency=safe_int(data.get('pedestrian-frequency')),
-            north_vph=north_vph,
-            north_forward_vph=safe_int(data.get('nb_forward')),
-            north_left_vph=safe_int(data.get('nb_left')),
-            north_right_vph=safe_int(data.get('nb_right')),
-            south_vph=south_vph,
-            south_forward_vph=safe_int(data.get('sb_forward')),
-            south_left_vph=safe_int(data.get('sb_left')),
-            south_right_vph=safe_int(data.get('sb_right')),
-            east_vph=east_vph,
-            east_forward_vph=safe_int(data.get('eb_forward')),
-            east_left_vph=safe_int(data.get('eb_left')),
-            east_right_vph=safe_int(data.get('eb_right')),
-            west_vph=west_vph,
-            west_forward_vph=safe_int(data.get('wb_forward')),
-            west_left_vph=safe_int(data.get('wb_left')),
-            west_right_vph=safe_int(data.get('wb_right'))
-        )
-        db.session.add(config)
-        db.session.commit()
-        print(f"Data stored with run_id {config.run_id}")
-
-        # Process traffic light settings
-        traffic_enabled = data.get('traffic-light-enable', '') == 'on'
-        if traffic_enabled:
-            tl_config = TrafficSettings(
-                run_id=config.run_id,
-                session_id=session_obj.id,
-                enabled=True,
-                sequences_per_hour=safe_int(data.get('tl_sequences')),
-                vertical_main_green=safe_int(data.get('tl_vmain')),
-                horizontal_main_green=safe_int(data.get('tl_hmain')),
-                vertical_right_green=safe_int(data.get('tl_vright')),
-                horizontal_right_green=safe_int(data.get('tl_hright'))
-            )
-        else:
-            tl_config = TrafficSettings(
-                run_id=config.run_id,
-                session_id=session_obj.id,
-                enabled=False,
-                sequences_per_hour=0,
-                vertical_main_green=0,
-                horizontal_main_green=0,
-                vertical_right_green=0,
-                horizontal_right_green=0
-            )
-        db.session.add(tl_config)
+        # Store user input in the database (Configuration). The rows are never read
+        # back as objects here, so Core inserts skip building and flushing ORM instances
+        config_row = {
+            "session_id": session_obj.id,
+            "lanes": values['lanes'],
+            "pedestrian_duration": values['pedestrian-duration'],
+            "pedestrian_frequency": values['pedestrian-frequency'],
+        }
+        for direction, prefix in FORM_DIRECTION_PREFIXES:
+            forward, left, right = (values[f"{prefix}_{movement}"] for movement in ("forward", "left", "right"))
+            config_row[f"{direction}_vph"] = forward + left + right
+            config_row[f"{direction}_forward_vph"] = forward
+            config_row[f"{direction}_left_vph"] = left
+            config_row[f"{direction}_right_vph"] = right
+        run_id = db.session.execute(Configuration.__table__.insert(), config_row).inserted_primary_key[0]
+
+        # Process traffic light settings, stored as zeros when disabled
+        db.session.execute(TrafficSettings.__table__.insert(), {
+            "run_id": run_id,
+            "session_id": session_obj.id,
+            "enabled": traffic_enabled,
+            "sequences_per_hour": values['tl_sequences'] if traffic_enabled else 0,
+            "vertical_main_green": values['tl_vmain'] if traffic_enabled else 0,
+            "horizontal_main_green": values['tl_hmain'] if traffic_enabled else 0,
+            "vertical_right_green": values['tl_vright'] if traffic_enabled else 0,
+            "horizontal_right_green": values['tl_hright'] if traffic_enabled else 0
+        })
         db.session.commit()
-        print(f"Traffic settings stored for run_id {config.run_id}")
+        logger.info("Configuration and traffic settings stored with run_id %s", run_id)
 
         # Construct spawn rates dictionary
         spawn_rates = {
-            "north": {
-                "forward": safe_int(data.get('nb_forward')),
-                "left": safe_int(data.get('nb_left')),
-                "right": safe_int(data.get('nb_right'))
-            },
-            "south": {
-                "forward": safe_int(data.get('sb_forward')),
-                "left": safe_int(data.get('sb_left')),
-                "right": safe_int(data.get('sb_right'))
-            },
-            "east": {
-                "forward": safe_int(data.get('eb_forward')),
-                "left": safe_int(data.get('eb_left')),
-                "right": safe_int(data.get('eb_right'))
-            },
-            "west": {
-                "forward": safe_int(data.get('wb_forward')),
-                "left": safe_int(data.get('wb_left')),
-                "right": safe_int(data.get('wb_right'))
+            direction: {
+                "forward": values[f"{prefix}_forward"],
+                "left": values[f"{prefix}_left"],
+                "right": values[f"{prefix}_right"]
             }
+            for direction, prefix in FORM_DIRECTION_PREFIXES
         }
-        print("Parsed Spawn Rates:", spawn_rates)
-
-        # Send spawn rates to server.py
-        try:
-            response = requests.post("http://127.0.0.1:8000/update_spawn_rates", json=spawn_rates)
-            if response.status_code == 200:
-                print("Spawn rates sent successfully to server.py.")
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Could not reach server.py: {e}")
+        logger.debug("Parsed spawn rates: %s", spawn_rates)
 
         # Construct junction settings dictionary
         junction_settings = {
-            "lanes": safe_int(data.get('lanes', 5)),
-            "pedestrian_duration": safe_int(data.get('pedestrian-duration')),
-            "pedestrian_frequency": safe_int(data.get('pedestrian-frequency'))
+            "lanes": values['lanes'],
+            "pedestrian_duration": values['pedestrian-duration'],
+            "pedestrian_frequency": values['pedestrian-frequency']
         }
-        print("Parsed Junction Settings:", junction_settings)
-
-        # Send junction settings to server.py
-        try:
-            response = requests.post("http://127.0.0.1:8000/update_junction_settings", json=junction_settings)
-            if response.status_code == 200:
-                print("Junction settings sent successfully to server.py.")
-            else:
-                print(f"Error sending junction settings: {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Could not reach server.py: {e}")
+        logger.debug("Parsed junction settings: %s", junction_settings)
 
         # Construct traffic light settings dictionary
         traffic_light_settings = {
             "traffic-light-enable": "on" if traffic_enabled else "",
-            "sequences": safe_int(data.get('tl_sequences')),
-            "vertical_main_green": safe_int(data.get('tl_vmain')),
-            "horizontal_main_green": safe_int(data.get('tl_hmain')),
-            "vertical_right_green": safe_int(data.get('tl_vright')),
-            "horizontal_right_green": safe_int(data.get('tl_hright'))
+            "sequences": values['tl_sequences'],
+            "vertical_main_green": values['tl_vmain'],
+            "horizontal_main_green": values['tl_hmain'],
+            "vertical_right_green": values['tl_vright'],
+            "horizontal_right_green": values['tl_hright']
         }
-        try:
-            response = requests.post("http://127.0.0.1:8000/update_traffic_light_settings", json=traffic_light_settings)
-            if response.status_code == 200:
-                print("Traffic light settings sent successfully to server.py.")
-            else:
-                print(f"Error sending traffic light settings: {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"Could not reach server.py for traffic lights: {e}")
 
-        print("THIS IS DEBUG", safe_int(data.get('lanes', 5)))
+        # Send all three settings to server.py in one background request
+        dispatch_settings_to_server(spawn_rates, junction_settings, traffic_light_settings)
 
-        return jsonify({
+        return orjson_response({
             "redirect_url": url_for('junctionPage'),
-            "lanes": safe_int(data.get('lanes', 5))
+            "lanes": values['lanes']
         })
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error: {e}")
-        return jsonify({'error': str(e)}), 400
+        logger.error("Error storing uploaded settings: %s", e)
+        return orjson_response({'error': str(e)}), 400
+
+def run_simulation(session_id, run_id):
+    """
+    Run the traffic simulation for a run and save its results.
+
+    Sends a GET request to the FastAPI simulation endpoint, saves the user and
+    algorithm metrics to the leaderboards and calculates both scores.
+
+    Args:
+        session_id (int): The session the run belongs to.
+        run_id (int): The run being simulated.
+
+    Returns:
+        dict: The simulation results, with "user" and "default" metrics and scores.
+
+    Raises:
+        Exception: If the simulation request fails or the results cannot be saved.
+    """
+
+    # Only one run is simulated at a time, whichever route requested it
+    with simulation_lock:
+        sim_response = http_session.get(f"{FASTAPI_URL}/simulate_fast", timeout=SIMULATION_TIMEOUT)
+        sim_response.raise_for_status()
+
+        metrics = sim_response.json()
+
+    user_metrics = metrics["user"]
+    algorithm_metrics = metrics["default"]
+
+    save_session_leaderboard_result([build_leaderboard_row(run_id, session_id, user_metrics)])
+
+    save_algorithm_result([build_leaderboard_row(run_id, session_id, algorithm_metrics)])
+
+    # Both leaderboard rows are committed together
+    db.session.commit()
+    
+    user_score = compute_score_4directions(
+        run_id,
+        session_id,
+        user_metrics["avg_wait_time_n"], user_metrics["max_wait_time_n"], user_metrics["max_queue_length_n"],
+        user_metrics["avg_wait_time_s"], user_metrics["max_wait_time_s"], user_metrics["max_queue_length_s"],
+        user_metrics["avg_wait_time_e"], user_metrics["max_wait_time_e"], user_metrics["max_queue_length_e"],
+        user_metrics["avg_wait_time_w"], user_metrics["max_wait_time_w"], user_metrics["max_queue_length_w"], 
+    )
+    
+    default_score = compute_score_4directions(
+        run_id,
+        session_id,
+        algorithm_metrics["avg_wait_time_n"], algorithm_metrics["max_wait_time_n"], algorithm_metrics["max_queue_length_n"],
+        algorithm_metrics["avg_wait_time_s"], algorithm_metrics["max_wait_time_s"], algorithm_metrics["max_queue_length_s"],
+        algorithm_metrics["avg_wait_time_e"], algorithm_metrics["max_wait_time_e"], algorithm_metrics["max_queue_length_e"],
+        algorithm_metrics["avg_wait_time_w"], algorithm_metrics["max_wait_time_w"], algorithm_metrics["max_queue_length_w"],
+    )
+    
+    return {
+        "message": "sim results saved",
+        "user": {
+            "max_wait_time_n": user_metrics["max_wait_time_n"],
+            "max_wait_time_s": user_metrics["max_wait_time_s"],
+            "max_wait_time_e": user_metrics["max_wait_time_e"],
+            "max_wait_time_w": user_metrics["max_wait_time_w"],
+            "max_queue_length_n": user_metrics["max_queue_length_n"],
+            "max_queue_length_s": user_metrics["max_queue_length_s"],
+            "max_queue_length_e": user_metrics["max_queue_length_e"],
+            "max_queue_length_w": user_metrics["max_queue_length_w"],
+            "avg_wait_time_n": user_metrics["avg_wait_time_n"],
+            "avg_wait_time_s": user_metrics["avg_wait_time_s"],
+            "avg_wait_time_e": user_metrics["avg_wait_time_e"],
+            "avg_wait_time_w": user_metrics["avg_wait_time_w"],
+            "score": user_score
+        },
+        "default": {
+            "max_wait_time_n": algorithm_metrics["max_wait_time_n"],
+            "max_wait_time_s": algorithm_metrics["max_wait_time_s"],
+            "max_wait_time_e": algorithm_metrics["max_wait_time_e"],
+            "max_wait_time_w": algorithm_metrics["max_wait_time_w"],
+            "max_queue_length_n": algorithm_metrics["max_queue_length_n"],
+            "max_queue_length_s": algorithm_metrics["max_queue_length_s"],
+            "max_queue_length_e": algorithm_metrics["max_queue_length_e"],
+            "max_queue_length_w": algorithm_metrics["max_queue_length_w"],
+            "avg_wait_time_n": algorithm_metrics["avg_wait_time_n"],
+            "avg_wait_time_s": algorithm_metrics["avg_wait_time_s"],
+            "avg_wait_time_e": algorithm_metrics["avg_wait_time_e"],
+            "avg_wait_time_w": algorithm_metrics["avg_wait_time_w"],
+            "score": default_score
+        }
+    }
 
 def simulate():
     """
     Simulate a traffic run and save the simulation results.
 
-    Retrieves simulation parameters (run_id and session_id) from the request JSON, then sends a GET request
-    to the FastAPI simulation endpoint. Then processes the simulation response to extract user and algorithm metrics, 
-    calculates scores and saves leaderboard results 
+    Retrieves simulation parameters (run_id and session_id) from the request JSON
+    and runs the simulation through run_simulation.
     
     Returns:
         Response: A response containing simulation results and computed scores,
@@ -1386,87 +1964,11 @@ def simulate():
         data = request.json
         run_id = data.get('run_id')
         session_id = data.get('session_id')
-        
-        sim_response = requests.get("http://localhost:8000/simulate_fast") 
-        sim_response.raise_for_status()  
-        
-        metrics = sim_response.json()
-
-        user_metrics = metrics["user"]
-        algorithm_metrics = metrics["default"]
-        
-        db.session.commit()
 
-        save_session_leaderboard_result(
-            run_id, session_id,
-            user_metrics["avg_wait_time_n"], user_metrics["max_wait_time_n"], user_metrics["max_queue_length_n"],
-            user_metrics["avg_wait_time_s"], user_metrics["max_wait_time_s"], user_metrics["max_queue_length_s"],
-            user_metrics["avg_wait_time_e"], user_metrics["max_wait_time_e"], user_metrics["max_queue_length_e"],
-            user_metrics["avg_wait_time_w"], user_metrics["max_wait_time_w"], user_metrics["max_queue_length_w"]
-        )
-        
-        save_algorithm_result(
-            run_id, session_id,
-            algorithm_metrics["avg_wait_time_n"], algorithm_metrics["max_wait_time_n"], algorithm_metrics["max_queue_length_n"],
-            algorithm_metrics["avg_wait_time_s"], algorithm_metrics["max_wait_time_s"], algorithm_metrics["max_queue_length_s"],
-            algorithm_metrics["avg_wait_time_e"], algorithm_metrics["max_wait_time_e"], algorithm_metrics["max_queue_length_e"],
-            algorithm_metrics["avg_wait_time_w"], algorithm_metrics["max_wait_time_w"], algorithm_metrics["max_queue_length_w"]
-        )
-        
-        user_score = compute_score_4directions(
-            run_id,
-            session_id,
-            user_metrics["avg_wait_time_n"], user_metrics["max_wait_time_n"], user_metrics["max_queue_length_n"],
-            user_metrics["avg_wait_time_s"], user_metrics["max_wait_time_s"], user_metrics["max_queue_length_s"],
-            user_metrics["avg_wait_time_e"], user_metrics["max_wait_time_e"], user_metrics["max_queue_length_e"],
-            user_metrics["avg_wait_time_w"], user_metrics["max_wait_time_w"], user_metrics["max_queue_length_w"], 
-        )
-        
-        default_score = compute_score_4directions(
-            run_id,
-            session_id,
-            algorithm_metrics["avg_wait_time_n"], algorithm_metrics["max_wait_time_n"], algorithm_metrics["max_queue_length_n"],
-            algorithm_metrics["avg_wait_time_s"], algorithm_metrics["max_wait_time_s"], algorithm_metrics["max_queue_length_s"],
-            algorithm_metrics["avg_wait_time_e"], algorithm_metrics["max_wait_time_e"], algorithm_metrics["max_queue_length_e"],
-            algorithm_metrics["avg_wait_time_w"], algorithm_metrics["max_wait_time_w"], algorithm_metrics["max_queue_length_w"],
-        )
-        
-        return jsonify({
-            "message": "sim results saved",
-            "user": {
-                "max_wait_time_n": user_metrics["max_wait_time_n"],
-                "max_wait_time_s": user_metrics["max_wait_time_s"],
-                "max_wait_time_e": user_metrics["max_wait_time_e"],
-                "max_wait_time_w": user_metrics["max_wait_time_w"],
-                "max_queue_length_n": user_metrics["max_queue_length_n"],
-                "max_queue_length_s": user_metrics["max_queue_length_s"],
-                "max_queue_length_e": user_metrics["max_queue_length_e"],
-                "max_queue_length_w": user_metrics["max_queue_length_w"],
-                "avg_wait_time_n": user_metrics["avg_wait_time_n"],
-                "avg_wait_time_s": user_metrics["avg_wait_time_s"],
-                "avg_wait_time_e": user_metrics["avg_wait_time_e"],
-                "avg_wait_time_w": user_metrics["avg_wait_time_w"],
-                "score": user_score
-            },
-            "default": {
-                "max_wait_time_n": algorithm_metrics["max_wait_time_n"],
-                "max_wait_time_s": algorithm_metrics["max_wait_time_s"],
-                "max_wait_time_e": algorithm_metrics["max_wait_time_e"],
-                "max_wait_time_w": algorithm_metrics["max_wait_time_w"],
-                "max_queue_length_n": algorithm_metrics["max_queue_length_n"],
-                "max_queue_length_s": algorithm_metrics["max_queue_length_s"],
-                "max_queue_length_e": algorithm_metrics["max_queue_length_e"],
-                "max_queue_length_w": algorithm_metrics["max_queue_length_w"],
-                "avg_wait_time_n": algorithm_metrics["avg_wait_time_n"],
-                "avg_wait_time_s": algorithm_metrics["avg_wait_time_s"],
-                "avg_wait_time_e": algorithm_metrics["avg_wait_time_e"],
-                "avg_wait_time_w": algorithm_metrics["avg_wait_time_w"],
-                "score": default_score
-            }
-        }), 201
+        return orjson_response(run_simulation(session_id, run_id)), 201
     except Exception as e:
         db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+        return orjson_response({"error": str(e)}), 400
 
 @app.route('/junctionPage')
 def junctionPage():
@@ -1488,9 +1990,7 @@ def leaderboards():
         Renders the page for leaderboards with the top results.
     """
     
-    results = get_all_time_best_configurations()
-
-    print(results)
+    results = get_cached_all_time_best_configurations()
     
     return render_template('leaderboards.html', results=results)
 
@@ -1499,14 +1999,29 @@ def get_all_time_best_configurations():
     """
     Gets and calcuates the all-time best configurations from the leaderboard.
 
-    The function joins leaderboard results with algorithm results and traffic settings,
-    computes scores, and returns the top 10 configurations based on the score difference.
+    The function joins leaderboard results with algorithm results, traffic settings
+    and configurations, and returns the top 10 configurations based on the score
+    difference. Both scores, their difference, the ordering and the limit are all
+    evaluated by the database, so only the 10 returned rows are loaded.
 
     Returns:
         list: A list of dictionaries containing configuration details and scores.
     """
     
-    results = db.session.query(LeaderboardResult, AlgorithmLeaderboardResult) \
+    user_score = score_expression(LeaderboardResult).label("user_score")
+    algorithm_score = score_expression(AlgorithmLeaderboardResult).label("algorithm_score")
+    score_difference = score_difference_expression(
+        AlgorithmLeaderboardResult, LeaderboardResult
+    ).label("score_difference")
+
+    rows = db.session.query(
+        LeaderboardResult.run_id,
+        LeaderboardResult.session_id,
+        user_score,
+        algorithm_score,
+        score_difference,
+        *(getattr(LeaderboardResult, column) for column in SCORE_METRIC_COLUMNS)
+    ) \
     .join(
         AlgorithmLeaderboardResult,
         and_(
@@ -1521,58 +2036,58 @@ def get_all_time_best_configurations():
             LeaderboardResult.session_id == TrafficSettings.session_id
         )
     ) \
+    .join(
+        Configuration,
+        and_(
+            LeaderboardResult.run_id == Configuration.run_id,
+            LeaderboardResult.session_id == Configuration.session_id
+        )
+    ) \
     .filter(TrafficSettings.enabled == True) \
+    .order_by(score_difference.desc(), LeaderboardResult.id) \
+    .limit(10) \
     .all()
 
-    results_with_scores = []
+    return [row._asdict() for row in rows]
 
-    for ur, ar in results:
-        user_score = compute_score_4directions(
-            ur.run_id,
-            ur.session_id,
-            ur.avg_wait_time_north, ur.max_wait_time_north, ur.max_queue_length_north,
-            ur.avg_wait_time_south, ur.max_wait_time_south, ur.max_queue_length_south,
-            ur.avg_wait_time_east, ur.max_wait_time_east, ur.max_queue_length_east,
-            ur.avg_wait_time_west, ur.max_wait_time_west, ur.max_queue_length_west
-        )
 
-        algorithm_score = compute_score_4directions(
-            ar.run_id,
-            ar.session_id,
-            ar.avg_wait_time_north, ar.max_wait_time_north, ar.max_queue_length_north,
-            ar.avg_wait_time_south, ar.max_wait_time_south, ar.max_queue_length_south,
-            ar.avg_wait_time_east, ar.max_wait_time_east, ar.max_queue_length_east,
-            ar.avg_wait_time_west, ar.max_wait_time_west, ar.max_queue_length_west
-        )
+# All-time best configurations, keyed by the newest row IDs they were built from
+all_time_best_cache = {"key": None, "results": None}
+all_time_best_lock = threading.Lock()
 
-        score_difference = algorithm_score - user_score
+def reset_all_time_best_cache():
+    """
+    Discard the cached all-time best configurations so the next lookup recomputes them.
+    """
 
-        result_data = {
-            "run_id": ur.run_id,
-            "session_id": ur.session_id,
-            "user_score": user_score,
-            "algorithm_score": algorithm_score,
-            "score_difference": score_difference,
-            "avg_wait_time_north": ur.avg_wait_time_north,
-            "max_wait_time_north": ur.max_wait_time_north,
-            "max_queue_length_north": ur.max_queue_length_north,
-            "avg_wait_time_south": ur.avg_wait_time_south,
-            "max_wait_time_south": ur.max_wait_time_south,
-            "max_queue_length_south": ur.max_queue_length_south,
-            "avg_wait_time_east": ur.avg_wait_time_east,
-            "max_wait_time_east": ur.max_wait_time_east,
-            "max_queue_length_east": ur.max_queue_length_east,
-            "avg_wait_time_west": ur.avg_wait_time_west,
-            "max_wait_time_west": ur.max_wait_time_west,
-            "max_queue_length_west": ur.max_queue_length_west,
-        }
+    with all_time_best_lock:
+        all_time_best_cache["key"] = None
+        all_time_best_cache["results"] = None
+
+def get_cached_all_time_best_configurations():
+    """
+    Return get_all_time_best_configurations, recomputing it only when new results exist.
 
-        results_with_scores.append(result_data)
+    Results and traffic settings are only ever inserted, so the highest ID of each
+    table identifies the data the leaderboard was built from. Checking them is a
+    single cheap query served by the primary keys.
+
+    Returns:
+        list: A list of dictionaries containing configuration details and scores.
+    """
 
-    results_with_scores.sort(key=lambda x: x["score_difference"], reverse=True)
+    key = tuple(db.session.query(
+        db.session.query(func.max(LeaderboardResult.id)).scalar_subquery(),
+        db.session.query(func.max(AlgorithmLeaderboardResult.id)).scalar_subquery(),
+        db.session.query(func.max(TrafficSettings.id)).scalar_subquery()
+    ).one())
 
-    return results_with_scores[:10]
+    with all_time_best_lock:
+        if all_time_best_cache["key"] != key:
+            all_time_best_cache["results"] = get_all_time_best_configurations()
+            all_time_best_cache["key"] = key
 
+        return all_time_best_cache["results"]
 
 @app.route('/session_leaderboard')
 def session_leaderboard_page():
@@ -1589,12 +2104,9 @@ def session_leaderboard_page():
     session_id = request.args.get('session_id', type=int)
     
     if not session_id:
-        active_session = Session.query.filter_by(active=True).order_by(Session.id.desc()).first()
-        session_id = active_session.id if active_session else None
+        session_id = get_active_session_id()
     
     runs = get_recent_runs_with_scores(session_id) if session_id else []
-
-    print(get_all_time_best_configurations())
     
     return render_template('session_leaderboard.html', runs=runs, session_id=session_id)
 
@@ -1629,23 +2141,16 @@ def algorithm_session_leaderboard_page():
     session_id = request.args.get('session_id', type=int)
     
     if not session_id:
-        active_session = Session.query.filter_by(active=True).order_by(Session.id.desc()).first()
-        session_id = active_session.id if active_session else None
-
-    print(session_id)
+        session_id = get_active_session_id()
     
     raw_runs = get_recent_algorithm_runs(session_id) if session_id else []
     
+    volumes = get_configuration_volumes(run.run_id for run in raw_runs)
+
+    scores = score_results(raw_runs, volumes)
+
     processed_runs = []
-    for run in raw_runs:
-        score = compute_score_4directions(
-            run.run_id,
-            run.session_id,
-            run.avg_wait_time_north, run.max_wait_time_north, run.max_queue_length_north,
-            run.avg_wait_time_south, run.max_wait_time_south, run.max_queue_length_south,
-            run.avg_wait_time_east, run.max_wait_time_east, run.max_queue_length_east,
-            run.avg_wait_time_west, run.max_wait_time_west, run.max_queue_length_west
-        )
+    for run, score in zip(raw_runs, scores):
         processed_runs.append({
             "run_id": run.run_id,
             "nb_avg_wait": run.avg_wait_time_north,
@@ -1676,6 +2181,244 @@ def simulate_endpoint():
     """
     return simulate()
 
+def run_simulation_in_background(session_id, run_id):
+    """
+    Run a simulation on the simulation_executor thread.
+
+    Args:
+        session_id (int): The session the run belongs to.
+        run_id (int): The run being simulated.
+
+    Returns:
+        dict: The simulation results, as returned by run_simulation.
+    """
+
+    with app.app_context():
+        try:
+            return run_simulation(session_id, run_id)
+        except Exception:
+            db.session.rollback()
+            raise
+
+def prune_simulation_tasks():
+    """
+    Discard the oldest finished simulation tasks beyond SIMULATION_TASK_LIMIT.
+    Must be called with simulation_tasks_lock held.
+    """
+
+    finished = [task_id for task_id, future in simulation_tasks.items() if future.done()]
+
+    for task_id in finished[:max(0, len(finished) - SIMULATION_TASK_LIMIT)]:
+        del simulation_tasks[task_id]
+
+@app.route('/simulate_async', methods=['POST'])
+def simulate_async():
+    """
+    Queue a simulation to run in the background.
+
+    Takes the same run_id and session_id JSON as /simulate, but returns at once
+    instead of holding the request open for the whole simulation.
+
+    Returns:
+        tuple: A JSON response with the task ID and its status URL, and a 202 status code,
+               or an error with a 400 status code if either ID is missing.
+    """
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return orjson_response({"error": "Expected a JSON object"}), 400
+
+    run_id = data.get('run_id')
+    session_id = data.get('session_id')
+
+    # Reject the request before a simulation is queued that could never be saved
+    if run_id is None or session_id is None:
+        return orjson_response({"error": "Missing run_id or session_id"}), 400
+
+    future = simulation_executor.submit(run_simulation_in_background, session_id, run_id)
+
+    task_id = uuid.uuid4().hex
+
+    with simulation_tasks_lock:
+        simulation_tasks[task_id] = future
+        prune_simulation_tasks()
+
+    return orjson_response({
+        "task_id": task_id,
+        "status_url": url_for('simulate_status', task_id=task_id)
+    }), 202
+
+@app.route('/simulate_status/<task_id>', methods=['GET'])
+def simulate_status(task_id):
+    """
+    Report the progress of a simulation queued with /simulate_async.
+
+    Args:
+        task_id (str): The ID returned by /simulate_async.
+
+    Returns:
+        tuple: A JSON response with the task status, and the simulation results
+               once it has finished, or an error with a 404 status code.
+    """
+
+    with simulation_tasks_lock:
+        future = simulation_tasks.get(task_id)
+
+    if future is None:
+        return orjson_response({"error": "Unknown simulation task"}), 404
+
+    if not future.done():
+        return orjson_response({"status": "pending"}), 202
+
+    error = future.exception()
+
+    if error is not None:
+        return orjson_response({"status": "failed", "error": str(error)}), 200
+
+    return orjson_response({"status": "done", "result": future.result()}), 200
+
+
+def configuration_volumes(config):
+    """
+    Total the vehicle volume of each direction of a loaded configuration.
+
+    Args:
+        config (Configuration): The run's configuration.
+
+    Returns:
+        tuple: The (north, south, east, west) vehicles per hour.
+    """
+
+    return tuple(
+        getattr(config, f"{direction}_forward_vph") +
+        getattr(config, f"{direction}_left_vph") +
+        getattr(config, f"{direction}_right_vph")
+        for direction in ("north", "south", "east", "west")
+    )
+
+def get_run_volumes(run_id, session_id):
+    """
+    Load the directional vehicle volumes of a single run.
+
+    Results are memoized on flask.g, so scoring both sides of a run in one
+    request queries them once, while every new request reads the stored
+    configuration again. A missing configuration raises and is not cached.
+
+    Args:
+        run_id (int): The run identifier.
+        session_id (int): The session identifier.
+
+    Returns:
+        tuple: The run's (north, south, east, west) vehicles per hour.
+
+    Raises:
+        ValueError: If no configuration exists for the run and session.
+    """
+
+    run_volumes = g.setdefault("run_volumes", {})
+
+    key = (run_id, session_id)
+    if key not in run_volumes:
+        volumes = db.session.query(
+            *(volume_expression(direction) for direction in ("north", "south", "east", "west"))
+        ).filter(Configuration.run_id == run_id, Configuration.session_id == session_id).first()
+
+        if volumes is None:
+            raise ValueError("Configuration not found for provided run and session ID.")
+
+        run_volumes[key] = tuple(volumes)
+
+    return run_volumes[key]
+
+# Largest number of run IDs bound into a single IN clause
+VOLUME_QUERY_CHUNK_SIZE = 500
+
+def get_configuration_volumes(run_ids):
+    """
+    Load the directional vehicle volumes for many runs at once, so a
+    leaderboard can be scored without one Configuration query per row.
+
+    Args:
+        run_ids (iterable): The run IDs to look up.
+
+    Returns:
+        dict: Maps (run_id, session_id) to the run's (north, south, east, west) volumes.
+    """
+
+    run_ids = iter(set(run_ids))
+    volumes = {}
+
+    # The totals are summed by SQLite, so no Configuration objects are built
+    query = db.session.query(
+        Configuration.run_id,
+        Configuration.session_id,
+        *(volume_expression(direction) for direction in ("north", "south", "east", "west"))
+    )
+
+    while True:
+        chunk = list(islice(run_ids, VOLUME_QUERY_CHUNK_SIZE))
+        if not chunk:
+            break
+        for run_id, session_id, *totals in query.filter(Configuration.run_id.in_(chunk)):
+            volumes[(run_id, session_id)] = tuple(totals)
+
+    return volumes
+
+def score_results(results, volumes):
+    """
+    Compute compute_score_4directions for many leaderboard results at once.
+
+    The metrics are packed into an (N, 4, 3) array and scored with a handful
+    of NumPy operations instead of one Python call per result.
+
+    Args:
+        results (list): LeaderboardResult or AlgorithmLeaderboardResult rows.
+        volumes (dict): Run volumes, as returned by get_configuration_volumes.
+
+    Returns:
+        list: The score of each result, in the same order.
+
+    Raises:
+        ValueError: If a result's configuration is missing from volumes.
+    """
+
+    if not results:
+        return []
+
+    try:
+        totals = np.array(
+            [volumes[(result.run_id, result.session_id)] for result in results],
+            dtype=np.float64
+        )
+    except KeyError:
+        raise ValueError("Configuration not found for provided run and session ID.")
+
+    metrics = np.array(
+        [[getattr(result, column) for column in SCORE_METRIC_COLUMNS] for result in results],
+        dtype=np.float64
+    )
+
+    return score_metric_rows(metrics, totals).tolist()
+
+def score_metric_rows(metrics, totals):
+    """
+    Score rows of raw metrics against their run volumes with NumPy.
+
+    Args:
+        metrics (ndarray): An (N, 12) array of metrics in SCORE_METRIC_COLUMNS order.
+        totals (ndarray): An (N, 4) array of (north, south, east, west) volumes.
+
+    Returns:
+        ndarray: The N combined four direction scores.
+    """
+
+    weighted = metrics.reshape(len(metrics), 4, 3) @ np.array(SCORE_WEIGHTS)
+
+    # Directions with no traffic contribute nothing to the score
+    safe_totals = np.where(totals == 0, 1.0, totals)
+    directional = np.where(totals == 0, 0.0, weighted / safe_totals)
+
+    return directional.sum(axis=1)
 
 def compute_score_4directions(
     run_id,
@@ -1684,6 +2427,7 @@ def compute_score_4directions(
     sb_avg, sb_max, sb_queue,
     eb_avg, eb_max, eb_queue,
     wb_avg, wb_max, wb_queue,
+    volumes=None,
 ):
     """
     Compute a combined score for four directions based on various traffic metrics.
@@ -1708,31 +2452,18 @@ def compute_score_4directions(
         wb_avg (float): Average wait time for westbound.
         wb_max (float): Maximum wait time for westbound.
         wb_queue (int): Maximum queue length for westbound.
+        volumes (tuple, optional): The run's (north, south, east, west) vehicle
+            volumes, as returned by get_configuration_volumes. Looked up from the
+            run's Configuration when not given.
 
     Returns:
         float: The computed total score.
     """
 
-    vehicle_input = Configuration.query.filter_by(run_id=run_id, session_id=session_id).first()
+    if volumes is None:
+        volumes = get_run_volumes(run_id, session_id)
 
-    if not vehicle_input:
-        raise ValueError("Configuration not found for provided run and session ID.")
-
-    north_total = (vehicle_input.north_forward_vph + 
-                   vehicle_input.north_left_vph + 
-                   vehicle_input.north_right_vph)
-
-    south_total = (vehicle_input.south_forward_vph + 
-                   vehicle_input.south_left_vph + 
-                   vehicle_input.south_right_vph)
-
-    east_total = (vehicle_input.east_forward_vph + 
-                  vehicle_input.east_left_vph + 
-                  vehicle_input.east_right_vph)
-
-    west_total = (vehicle_input.west_forward_vph + 
-                  vehicle_input.west_left_vph + 
-                  vehicle_input.west_right_vph)
+    north_total, south_total, east_total, west_total = volumes
     
     def directional_score(avg, max_w, queue, volume):
         """
@@ -1750,7 +2481,9 @@ def compute_score_4directions(
         if volume == 0:
             return 0
 
-        weighted_score = (0.45 * avg) + (0.2 * max_w) + (0.35 * queue)
+        avg_weight, max_weight, queue_weight = SCORE_WEIGHTS
+
+        weighted_score = (avg_weight * avg) + (max_weight * max_w) + (queue_weight * queue)
 
         return weighted_score / volume
 
@@ -1767,8 +2500,8 @@ def get_recent_runs_with_scores(session_id):
     """
     Retrieve the recent runs for a session with user and algorithm scores.
 
-    Joins leaderboard and algorithm results, computes the score difference for each run,
-    and returns a sorted list of runs.
+    Joins leaderboard and algorithm results in a single query, computes the score
+    difference for each run, and returns a sorted list of runs.
 
     Args:
         session_id (int): To identify the session.
@@ -1777,45 +2510,42 @@ def get_recent_runs_with_scores(session_id):
         list: A list of dictionaries containing run details and scores.
     """
     
+    # One joined query keeps each user result paired with the algorithm result of the same run
     recent_runs = (
-        LeaderboardResult.query
-        .join(TrafficSettings, LeaderboardResult.run_id == TrafficSettings.run_id)
+        db.session.query(LeaderboardResult, AlgorithmLeaderboardResult)
+        .join(
+            AlgorithmLeaderboardResult,
+            and_(
+                LeaderboardResult.run_id == AlgorithmLeaderboardResult.run_id,
+                LeaderboardResult.session_id == AlgorithmLeaderboardResult.session_id
+            )
+        )
+        .join(
+            TrafficSettings,
+            and_(
+                LeaderboardResult.run_id == TrafficSettings.run_id,
+                LeaderboardResult.session_id == TrafficSettings.session_id
+            )
+        )
         .filter(LeaderboardResult.session_id == session_id, TrafficSettings.enabled == True)
         .order_by(LeaderboardResult.run_id.desc())
         .limit(10)
-        .all(),
-        AlgorithmLeaderboardResult.query
-        .join(TrafficSettings, AlgorithmLeaderboardResult.run_id == TrafficSettings.run_id)
-        .filter(AlgorithmLeaderboardResult.session_id == session_id, TrafficSettings.enabled == True)
-        .order_by(AlgorithmLeaderboardResult.run_id.desc())
-        .limit(10)
         .all()
     )
 
-    
     runs_with_scores = []
 
-    leaderboard_results, algorithm_leaderboard_results = recent_runs
+    leaderboard_results = [ur for ur, _ in recent_runs]
+    algorithm_leaderboard_results = [ar for _, ar in recent_runs]
 
-    for ur, ar in zip(leaderboard_results, algorithm_leaderboard_results):
+    volumes = get_configuration_volumes(result.run_id for result in leaderboard_results)
 
-        user_final_score = compute_score_4directions(
-            ur.run_id,
-            ur.session_id,
-            ur.avg_wait_time_north, ur.max_wait_time_north, ur.max_queue_length_north,
-            ur.avg_wait_time_south, ur.max_wait_time_south, ur.max_queue_length_south,
-            ur.avg_wait_time_east,  ur.max_wait_time_east,  ur.max_queue_length_east,
-            ur.avg_wait_time_west,  ur.max_wait_time_west,  ur.max_queue_length_west,
-        )
+    user_scores = score_results(leaderboard_results, volumes)
+    algorithm_scores = score_results(algorithm_leaderboard_results, volumes)
 
-        algorithm_final_score = compute_score_4directions(
-            ar.run_id,
-            ar.session_id,
-            ar.avg_wait_time_north, ar.max_wait_time_north, ar.max_queue_length_north,
-            ar.avg_wait_time_south, ar.max_wait_time_south, ar.max_queue_length_south,
-            ar.avg_wait_time_east,  ar.max_wait_time_east,  ar.max_queue_length_east,
-            ar.avg_wait_time_west,  ar.max_wait_time_west,  ar.max_queue_length_west,
-        )
+    for ur, ar, user_final_score, algorithm_final_score in zip(
+        leaderboard_results, algorithm_leaderboard_results, user_scores, algorithm_scores
+    ):
 
         final_score = algorithm_final_score - user_final_score
 
@@ -1847,11 +2577,12 @@ def get_recent_runs_with_scores(session_id):
     if not runs_with_scores:
         return []
 
-    best_run = max(runs_with_scores, key=lambda x: x["score"])
+    scores = list(map(itemgetter("score"), runs_with_scores))
+    best_index = max(range(len(scores)), key=scores.__getitem__)
 
-    runs_with_scores.remove(best_run)
+    best_run = runs_with_scores.pop(best_index)
 
-    runs_with_scores.sort(key=lambda x: x["run_id"], reverse=True)
+    runs_with_scores.sort(key=itemgetter("run_id"), reverse=True)
     
     final_list = [best_run] + runs_with_scores
 
@@ -1878,9 +2609,26 @@ def junction_details():
     if not run_id:
         return redirect(url_for('error', message="No run ID provided."))
 
-    # Query configuration based on run_id and session_id.
-    if session_id:
-        configuration = Configuration.query.filter_by(run_id=run_id, session_id=session_id).first()
+    # Load the configuration with its traffic settings and both leaderboard results
+    # in one round-trip; rows missing for this run come back as None
+    row = (
+        db.session.query(Configuration, TrafficSettings, LeaderboardResult, AlgorithmLeaderboardResult)
+        .outerjoin(TrafficSettings, and_(
+            TrafficSettings.run_id == Configuration.run_id,
+            TrafficSettings.session_id == Configuration.session_id,
+        ))
+        .outerjoin(LeaderboardResult, and_(
+            LeaderboardResult.run_id == Configuration.run_id,
+            LeaderboardResult.session_id == Configuration.session_id,
+        ))
+        .outerjoin(AlgorithmLeaderboardResult, and_(
+            AlgorithmLeaderboardResult.run_id == Configuration.run_id,
+            AlgorithmLeaderboardResult.session_id == Configuration.session_id,
+        ))
+        .filter(Configuration.run_id == run_id, Configuration.session_id == session_id)
+        .first()
+    )
+    configuration, tls_obj, user_result, algo_result = row if row else (None, None, None, None)
 
     if not configuration:
         flash('Configuration details not found for the provided run.')
@@ -1888,11 +2636,10 @@ def junction_details():
     
     session_id = configuration.session_id
 
-    # Query traffic settings.
-    if session_id:
-        tls_obj = TrafficSettings.query.filter_by(run_id=run_id, session_id=session_id).first()
-    else:
-        tls_obj = TrafficSettings.query.filter_by(run_id=run_id).first()
+    # Both scores are normalised by the volumes of the configuration already loaded
+    volumes = configuration_volumes(configuration)
+
+    # Traffic settings.
     if not tls_obj:
         traffic_light_settings = {
             "enabled": False,
@@ -1912,8 +2659,7 @@ def junction_details():
             "horizontal_right_green": tls_obj.horizontal_right_green
         }
 
-    # Query user leaderboard result.
-    user_result = LeaderboardResult.query.filter_by(run_id=run_id, session_id=session_id).first()
+    # User leaderboard result.
     if user_result:
         user_metrics = {
             "avg_wait_time_n": user_result.avg_wait_time_north,
@@ -1943,7 +2689,8 @@ def junction_details():
             user_metrics["max_queue_length_e"],
             user_metrics["avg_wait_time_w"],
             user_metrics["max_wait_time_w"],
-            user_metrics["max_queue_length_w"]
+            user_metrics["max_queue_length_w"],
+            volumes=volumes
         )
     else:
         user_metrics = {
@@ -1953,8 +2700,7 @@ def junction_details():
             "score": 0.0
         }
 
-    # Query algorithm leaderboard result.
-    algo_result = AlgorithmLeaderboardResult.query.filter_by(run_id=run_id, session_id=session_id).first()
+    # Algorithm leaderboard result.
     if algo_result:
         algorithm_metrics = {
             "avg_wait_time_n": algo_result.avg_wait_time_north,
@@ -1984,7 +2730,8 @@ def junction_details():
             algorithm_metrics["max_queue_length_e"],
             algorithm_metrics["avg_wait_time_w"],
             algorithm_metrics["max_wait_time_w"],
-            algorithm_metrics["max_queue_length_w"]
+            algorithm_metrics["max_queue_length_w"],
+            volumes=volumes
         )
     else:
         algorithm_metrics = {
@@ -2023,57 +2770,57 @@ def search_algorithm_runs():
     return render_template('search_Algorithm_Runs.html')
 
 
+# Rows fetched from the database at a time while streaming the metrics export
+METRICS_EXPORT_BATCH_SIZE = 1000
+
 @app.route('/download_metrics_json')
 def download_metrics_json():
     """"
     Generate and download metrics as a JSON file.
 
-    Computes scores for each record, and returns a 
+    Computes scores for each record, and streams a
     JSON response with one JSON object per line.
 
     Returns:
         A Flask Response object containing the metrics in JSON format.
     """
-    results = db.session.query(LeaderboardResult, AlgorithmLeaderboardResult).join(
+    # Both scores and their difference are evaluated by the database, so each row
+    # arrives as the five exported values rather than two full result objects
+    user_score = score_expression(LeaderboardResult).label("user_score")
+    algo_score = score_expression(AlgorithmLeaderboardResult).label("algo_score")
+    score_diff = score_difference_expression(AlgorithmLeaderboardResult, LeaderboardResult).label("score_diff")
+
+    results = db.session.query(
+        LeaderboardResult.run_id,
+        LeaderboardResult.session_id,
+        user_score,
+        algo_score,
+        score_diff
+    ) \
+    .join(
         AlgorithmLeaderboardResult,
         LeaderboardResult.run_id == AlgorithmLeaderboardResult.run_id
-    ).all()
-
-    lines = []
-    for ur, ar in results:
-        user_score = compute_score_4directions(
-            ur.run_id,
-            ur.session_id,
-            ur.avg_wait_time_north, ur.max_wait_time_north, ur.max_queue_length_north,
-            ur.avg_wait_time_south, ur.max_wait_time_south, ur.max_queue_length_south,
-            ur.avg_wait_time_east,  ur.max_wait_time_east,  ur.max_queue_length_east,
-            ur.avg_wait_time_west, ur.max_wait_time_west, ur.max_queue_length_west,
-        )
-        algo_score = compute_score_4directions(
-            ar.run_id,
-            ar.session_id,
-            ar.avg_wait_time_north, ar.max_wait_time_north, ar.max_queue_length_north,
-            ar.avg_wait_time_south, ar.max_wait_time_south, ar.max_queue_length_south,
-            ar.avg_wait_time_east, ar.max_wait_time_east, ar.max_queue_length_east,
-            ar.avg_wait_time_west, ar.max_wait_time_west, ar.max_queue_length_west,
+    ) \
+    .join(
+        Configuration,
+        and_(
+            LeaderboardResult.run_id == Configuration.run_id,
+            LeaderboardResult.session_id == Configuration.session_id
         )
-        score = algo_score - user_score
+    )
 
-        # If traffic is disabled, skip user_score or set it to None, etc.
-        # For now, we include user_score for demonstration.
-        record = {
-            "run_id": ur.run_id,
-            "session_id": ur.session_id,
-            "user_score": user_score,
-            "algo_score": algo_score,
-            "score_diff": score
-        }
-        lines.append(json.dumps(record))
-    content = "\n".join(lines)
+    # orjson encodes each record straight to bytes; the stdlib encoder is the fallback
+    encode = orjson.dumps if orjson is not None else lambda record: json.dumps(record).encode()
+
+    def generate():
+        # Rows are fetched in batches while the response is sent, and each record
+        # is sent as soon as it is encoded instead of building the whole file
+        for row in results.yield_per(METRICS_EXPORT_BATCH_SIZE):
+            yield encode(row._asdict()) + b"\n"
 
     return Response(
-        content,
-        mimetype="application/json",
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
         headers={"Content-Disposition": "attachment;filename=metrics.json"}
     )
 
@@ -2089,4 +2836,7 @@ def loading():
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        init_db()
     app.run(debug=True)
\ No newline at end of file
@@ -404,6 +404,31 @@ def update_traffic_light_settings(data: Dict[str, Any]):
     
     return {"message": "Traffic light settings updated successfully"}
 
+@app.post("/update_all_settings")
+def update_all_settings(data: Dict[str, Any]):
+    """
+    Updates spawn rates, junction settings and traffic light settings in one request.
+    
+    Accepts POST request with a dictionary holding any of the keys 'spawn_rates',
+    'junction_settings' and 'traffic_light_settings', and applies each one present
+    exactly as its individual update endpoint would. Traffic light settings are
+    applied last, as they are what releases the traffic loop on startup.
+    
+    Parameters:
+        data: Dictionary containing the combined settings
+    """
+    
+    if "spawn_rates" in data:
+        update_spawn_rates(data["spawn_rates"])
+    
+    if "junction_settings" in data:
+        update_junction_settings(data["junction_settings"])
+    
+    if "traffic_light_settings" in data:
+        update_traffic_light_settings(data["traffic_light_settings"])
+    
+    return {"message": "All settings updated successfully"}
+
 @app.get("/traffic_light_settings")
 def get_traffic_light_settings():
     """
@@ -30,6 +30,10 @@ class Configuration(db.Model):
     All configuration data from a user, except the users traffic settings.
     """
     __tablename__ = 'configurations'
+    __table_args__ = (
+        # Serves filter_by(session_id=...) lookups of a session's configurations
+        db.Index('idx_config_session', 'session_id'),
+    )
     run_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     session_id = db.Column(db.Integer, db.ForeignKey('sessions.id'), nullable=False)
 
@@ -75,6 +79,10 @@ class LeaderboardResult(db.Model):
     dynamic algorithms score metrics.
     """
     __tablename__ = 'leaderboard_results'
+    __table_args__ = (
+        # Serves filter_by(session_id=..., run_id=...) and per-session leaderboards
+        db.Index('idx_lbr_session_run', 'session_id', 'run_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     run_id = db.Column(db.Integer, db.ForeignKey('configurations.run_id'), nullable=False)
     session_id = db.Column(db.Integer, db.ForeignKey('sessions.id'), nullable=False)
@@ -129,6 +137,10 @@ class TrafficSettings(db.Model):
     disabled they can view our highly efficient dynamic algorithm.
     """
     __tablename__ = 'traffic_settings'
+    __table_args__ = (
+        # Serves filter_by(run_id=...) lookups and the run joins of the leaderboards
+        db.Index('idx_ts_run_session', 'run_id', 'session_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     run_id = db.Column(db.Integer, db.ForeignKey('configurations.run_id'), nullable=False)
     session_id = db.Column(db.Integer, db.ForeignKey('sessions.id'), nullable=False)
@@ -165,6 +177,10 @@ class AlgorithmLeaderboardResult(db.Model):
     Stores runs where user both enabled or disabled user traffic settings contrary to other leaderboard.
     """
     __tablename__ = 'algorithm_leaderboard_results'
+    __table_args__ = (
+        # Serves filter_by(run_id=..., session_id=...) and the joins against LeaderboardResult
+        db.Index('idx_alg_session_run', 'session_id', 'run_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     run_id = db.Column(db.Integer, db.ForeignKey('configurations.run_id'), nullable=False)
     session_id = db.Column(db.Integer, db.ForeignKey('sessions.id'), nullable=False)
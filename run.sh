@@ -3,5 +3,8 @@
 # Start FastAPI (server.py) in background
 uvicorn backend.server:app --host 0.0.0.0 --port 8001 &
 
+# Create the database tables once, before the workers start
+FLASK_APP=app flask init-db
+
 # Start Flask (app.py) on main Render port (5000)
 gunicorn app:app -b 0.0.0.0:5000
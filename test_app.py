@@ -2,9 +2,11 @@ import io
 import json
 import csv
 import pytest
-from flask import jsonify
+import socket
+import time
+from sqlalchemy import inspect
 from sqlalchemy.pool import StaticPool
-from app import app, db, create_session, end_session, compute_score_4directions, process_csv, get_latest_spawn_rates, get_latest_junction_settings, get_latest_traffic_light_settings, simulate
+from app import app, db, orjson_response, wait_for_fastapi, reset_latest_config_cache, reset_all_time_best_cache, get_cached_all_time_best_configurations, reset_active_session_cache, get_active_session_id, safe_int, parse_upload_json, parse_upload_csv, create_session, end_session, compute_score_4directions, process_csv, get_latest_spawn_rates, get_latest_junction_settings, get_latest_traffic_light_settings, get_latest_settings, simulate, build_leaderboard_row, save_leaderboard_results_bulk, get_session_leaderboard, get_configuration_volumes, get_run_volumes, score_results, get_all_time_best_configurations, get_recent_runs_with_scores, simulation_tasks, simulation_tasks_lock, simulation_lock, run_simulation, send_settings_to_server
 from models import (
     Configuration, Session, TrafficSettings,
     LeaderboardResult, AlgorithmLeaderboardResult
@@ -53,6 +55,22 @@ def create_full_configuration(session_id, run_id=1, lanes=3, p_duration=10, p_fr
         west_right_vph=right
     )
 
+# --- Helper: an uploaded configuration CSV with the given data lines ---
+CONFIGURATION_CSV_HEADER = ",".join((
+    "pedestrian_duration", "pedestrian_frequency",
+    "north_forward_vph", "north_left_vph", "north_right_vph",
+    "south_forward_vph", "south_left_vph", "south_right_vph",
+    "east_forward_vph", "east_left_vph", "east_right_vph",
+    "west_forward_vph", "west_left_vph", "west_right_vph",
+))
+
+class DummyFile:
+    def __init__(self, content):
+        self.stream = io.BytesIO(content.encode("utf-8"))
+
+def configuration_csv_file(*lines):
+    return DummyFile("\n".join((CONFIGURATION_CSV_HEADER,) + lines) + "\n")
+
 # --- Pytest fixture for the Flask test client with an in-memory database ---
 @pytest.fixture
 def client():
@@ -63,6 +81,9 @@ def client():
         'connect_args': {'check_same_thread': False},
         'poolclass': StaticPool
     }
+    reset_latest_config_cache()
+    reset_all_time_best_cache()
+    reset_active_session_cache()
     with app.app_context():
         db.create_all()
         # Create a dummy session and update the module-level global session id.
@@ -91,6 +112,123 @@ def test_stop_simulation(client, monkeypatch):
     assert response.status_code == 200
     assert data["message"] == "FastAPI server stopped"
 
+def test_wait_for_fastapi(monkeypatch):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    address = listener.getsockname()
+    monkeypatch.setattr("app.FASTAPI_ADDRESS", address)
+    monkeypatch.setattr("app.server_process", None)
+    assert wait_for_fastapi(timeout=0.2) is False
+    listener.listen()
+    try:
+        assert wait_for_fastapi(timeout=1.0) is True
+    finally:
+        listener.close()
+
+def test_serve_frontend(client):
+    response = client.get("/frontend/main.js")
+    assert response.status_code == 200
+    response.close()
+    assert client.get("/frontend/does_not_exist.js").status_code == 404
+
+def test_upload_json(client, monkeypatch):
+    monkeypatch.setattr("app.start_fastapi", lambda: None)
+    monkeypatch.setattr("app.stop_fastapi", lambda: None)
+    sent = []
+    monkeypatch.setattr("app.dispatch_settings_to_server", lambda *settings: sent.append(settings))
+    with app.app_context():
+        session_id = Session.query.order_by(Session.id.desc()).first().id
+    with client.session_transaction() as cookie:
+        cookie["sid"] = session_id
+    upload = {
+        "vehicle_settings": {
+            "north": {"forward": 4, "turning_left": 2, "turning_right": 1},
+            "east": {"forward": 3, "turning_left": 0, "turning_right": 0},
+        },
+        "junction_settings": {"number_of_lanes": 3, "pedestrian_duration": 6},
+        "traffic_light_settings": {"enabled": False},
+    }
+    data = {"file": (io.BytesIO(json.dumps(upload).encode("utf-8")), "settings.json")}
+    response = client.post("/upload", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.get_json()["lanes"] == 3
+    with app.app_context():
+        config = Configuration.query.filter_by(session_id=session_id).one()
+        assert config.north_vph == 7
+        assert config.east_forward_vph == 3
+        assert config.pedestrian_duration == 6
+    assert len(sent) == 1
+    spawn_rates, junction_settings, traffic_light_settings = sent[0]
+    assert spawn_rates["north"] == {"forward": 4, "left": 2, "right": 1}
+    assert junction_settings["lanes"] == 3
+    assert traffic_light_settings["traffic-light-enable"] == ""
+
+def test_parse_upload_json_defaults():
+    values, traffic_enabled = parse_upload_json({
+        "vehicle_settings": {"north": {"forward": "7", "turning_left": 2}},
+        "traffic_light_settings": {"enabled": True, "horizontal_sequence": {"right_green_length": None}},
+    })
+    assert values["nb_forward"] == 7
+    assert values["nb_left"] == 2
+    assert values["wb_right"] == 0
+    assert values["lanes"] == 5
+    assert values["tl_hright"] == 0
+    assert traffic_enabled is True
+
+def test_upload_json_rejects_non_objects(client, monkeypatch):
+    monkeypatch.setattr("app.start_fastapi", lambda: None)
+    monkeypatch.setattr("app.stop_fastapi", lambda: None)
+    sent = []
+    monkeypatch.setattr("app.dispatch_settings_to_server", lambda *settings: sent.append(settings))
+    with app.app_context():
+        session_id = Session.query.order_by(Session.id.desc()).first().id
+    with client.session_transaction() as cookie:
+        cookie["sid"] = session_id
+    for upload in ([1, 2], {"vehicle_settings": 5}):
+        with pytest.raises(ValueError):
+            parse_upload_json(upload)
+        data = {"file": (io.BytesIO(json.dumps(upload).encode("utf-8")), "settings.json")}
+        response = client.post("/upload", data=data, content_type="multipart/form-data")
+        assert response.status_code == 400
+    with app.app_context():
+        assert Configuration.query.filter_by(session_id=session_id).count() == 0
+    assert sent == []
+
+def test_upload_csv(client, monkeypatch):
+    monkeypatch.setattr("app.start_fastapi", lambda: None)
+    monkeypatch.setattr("app.stop_fastapi", lambda: None)
+    sent = []
+    monkeypatch.setattr("app.dispatch_settings_to_server", lambda *settings: sent.append(settings))
+    with app.app_context():
+        session_id = Session.query.order_by(Session.id.desc()).first().id
+    with client.session_transaction() as cookie:
+        cookie["sid"] = session_id
+    csv_content = (
+        "north_forward,north_tleft,north_tright,south_forward,number_of_lanes,"
+        "enable_traffic_light_settings,traffic_cycles,vertical_sequence_main_green_length\n"
+        "5,1,2,9,4,TRUE,6,20\n"
+    )
+    data = {"file": (io.BytesIO(csv_content.encode("utf-8")), "settings.csv")}
+    response = client.post("/upload", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.get_json()["lanes"] == 4
+    with app.app_context():
+        config = Configuration.query.filter_by(session_id=session_id).one()
+        assert config.north_vph == 8
+        assert config.south_forward_vph == 9
+        assert config.east_vph == 0
+        ts = TrafficSettings.query.filter_by(run_id=config.run_id).one()
+        assert ts.enabled is True
+        assert ts.sequences_per_hour == 6
+        assert ts.vertical_main_green == 20
+    assert sent[0][2]["traffic-light-enable"] == "on"
+
+def test_parse_upload_csv_skips_blank_rows():
+    values, traffic_enabled = parse_upload_csv(io.StringIO("north_forward,number_of_lanes\n\n7,3\n"))
+    assert values["nb_forward"] == 7
+    assert values["lanes"] == 3
+    assert traffic_enabled is False
+
 def test_back_to_parameters(client, monkeypatch):
     monkeypatch.setattr("app.stop_fastapi", lambda: None)
     response = client.get("/back_to_parameters", follow_redirects=False)
@@ -98,6 +236,72 @@ def test_back_to_parameters(client, monkeypatch):
     location = response.headers.get("Location")
     assert "/parameters" in location
 
+def test_parameters_post_stores_and_dispatches(client, monkeypatch):
+    with app.app_context():
+        session_id = Session.query.order_by(Session.id.desc()).first().id
+    with client.session_transaction() as cookie:
+        cookie["sid"] = session_id
+    sent = {}
+    monkeypatch.setattr("app.dispatch_settings_to_server",
+                        lambda spawn, junction, lights: sent.update(spawn=spawn, junction=junction))
+    form = {"lanes": "4", "pedestrian-duration": "7", "pedestrian-frequency": "3"}
+    for i, prefix in enumerate(("nb", "sb", "eb", "wb")):
+        form.update({f"{prefix}_forward": str(i + 1), f"{prefix}_left": "2", f"{prefix}_right": "3"})
+    response = client.post("/parameters", data=form)
+    assert response.status_code in (301, 302)
+    with app.app_context():
+        config = Configuration.query.order_by(Configuration.run_id.desc()).first()
+        assert config.lanes == 4
+        assert config.west_forward_vph == 4
+        assert config.west_vph == 9
+        assert TrafficSettings.query.filter_by(run_id=config.run_id).one().enabled is False
+    assert sent["spawn"]["south"] == {"forward": 2, "left": 2, "right": 3}
+    assert sent["junction"]["lanes"] == 4
+
+def test_parameters_clamp_negative_values(client, monkeypatch):
+    with app.app_context():
+        session_id = Session.query.order_by(Session.id.desc()).first().id
+    with client.session_transaction() as cookie:
+        cookie["sid"] = session_id
+    monkeypatch.setattr("app.dispatch_settings_to_server", lambda *settings: None)
+    form = {"lanes": "4", "pedestrian-duration": "-7", "pedestrian-frequency": "3",
+            "traffic-light-enable": "on", "tl_vmain": "-30"}
+    for prefix in ("nb", "sb", "eb", "wb"):
+        form.update({f"{prefix}_forward": "1", f"{prefix}_left": "1", f"{prefix}_right": "1"})
+    form["nb_forward"] = "-2"
+    client.post("/parameters", data=form)
+    with app.app_context():
+        config = Configuration.query.order_by(Configuration.run_id.desc()).first()
+        assert config.north_forward_vph == 0
+        assert config.north_vph == 2
+        assert config.pedestrian_duration == 0
+        assert TrafficSettings.query.filter_by(run_id=config.run_id).one().vertical_main_green == 0
+    values, _ = parse_upload_json({"vehicle_settings": {"north": {"forward": -2}}})
+    assert values["nb_forward"] == 0
+    values, _ = parse_upload_csv(io.StringIO("north_forward,number_of_lanes\n-2,-3\n"))
+    assert values["nb_forward"] == 0
+    assert values["lanes"] == 0
+
+def test_parameters_use_each_browsers_own_session(client, monkeypatch):
+    monkeypatch.setattr("app.dispatch_settings_to_server", lambda *settings: None)
+    form = {"lanes": "4", "pedestrian-duration": "7", "pedestrian-frequency": "3"}
+    for prefix in ("nb", "sb", "eb", "wb"):
+        form.update({f"{prefix}_forward": "1", f"{prefix}_left": "2", f"{prefix}_right": "3"})
+    client.get("/")
+    client.post("/parameters", data=form)
+    with client.session_transaction() as cookie:
+        first = cookie["sid"]
+    # Another browser opening the index page starts its own session
+    with app.test_client() as other:
+        other.get("/")
+        with other.session_transaction() as cookie:
+            second = cookie["sid"]
+    assert second != first
+    client.post("/parameters", data=form)
+    with app.app_context():
+        assert Configuration.query.filter_by(session_id=first).count() == 2
+        assert Configuration.query.filter_by(session_id=second).count() == 0
+
 # =========================
 # Helper Function Tests
 # =========================
@@ -126,26 +330,291 @@ def test_get_latest_junction_settings(client):
         assert settings["lanes"] == 4
         assert settings["pedestrian_duration"] == 10
 
+def test_get_latest_configuration_cache_refreshes(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1, lanes=4))
+        db.session.commit()
+        assert get_latest_junction_settings()["lanes"] == 4
+        # A newer run_id must be picked up without an explicit reset
+        db.session.add(create_full_configuration(session_id=s.id, run_id=2, lanes=2))
+        db.session.commit()
+        assert get_latest_junction_settings()["lanes"] == 2
+
+def test_safe_int():
+    assert safe_int("12") == 12
+    assert safe_int(" 7 ") == 7
+    assert safe_int("-3") == -3
+    assert safe_int(5) == 5
+    assert safe_int("abc") == 0
+    assert safe_int("") == 0
+    assert safe_int(None) == 0
+    assert safe_int(7.9) == 7
+    assert safe_int(True) == 1
+
+def test_orjson_response_matches_flask_output(client):
+    with app.test_request_context():
+        response = orjson_response({"run_id": 1, 2: [1.5, None]})
+        assert response.mimetype == "application/json"
+        assert response.get_json() == {"run_id": 1, "2": [1.5, None]}
+        assert orjson_response(a=1, b="x").get_json() == {"a": 1, "b": "x"}
+
 def test_get_latest_traffic_light_settings(client):
     with app.app_context():
         ts = get_latest_traffic_light_settings()
         assert ts["enabled"] is False
 
-def test_process_csv():
-    csv_content = (
-        "pedestrian_duration,pedestrian_frequency,north_forward_vph,north_left_vph,north_right_vph,"
-        "south_forward_vph,south_left_vph,south_right_vph,east_forward_vph,east_left_vph,east_right_vph,"
-        "west_forward_vph,west_left_vph,west_right_vph\n"
-        "10,5,5,3,2,4,4,1,6,2,3,7,3,4\n"
+def test_get_latest_traffic_light_settings_stored(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1))
+        db.session.add(TrafficSettings(
+            run_id=1, session_id=s.id, enabled=True,
+            sequences_per_hour=10, vertical_main_green=30,
+            horizontal_main_green=25, vertical_right_green=5,
+            horizontal_right_green=5
+        ))
+        db.session.commit()
+        assert get_latest_traffic_light_settings() == {
+            "enabled": True,
+            "sequences_per_hour": 10,
+            "vertical_main_green": 30,
+            "horizontal_main_green": 25,
+            "vertical_right_green": 5,
+            "horizontal_right_green": 5,
+        }
+        db.session.add(TrafficSettings(run_id=1, session_id=s.id, enabled=False))
+        db.session.commit()
+        refreshed = get_latest_traffic_light_settings()
+        assert refreshed["enabled"] is False
+        assert refreshed["sequences_per_hour"] == 0
+
+def test_get_latest_settings(client):
+    with app.app_context():
+        spawn_rates, junction_settings, traffic_light_settings = get_latest_settings()
+        assert spawn_rates == {}
+        assert junction_settings["lanes"] == 5
+        assert traffic_light_settings["enabled"] is False
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1, lanes=4, traffic=7))
+        db.session.add(TrafficSettings(run_id=1, session_id=s.id, enabled=True, sequences_per_hour=12))
+        db.session.commit()
+        spawn_rates, junction_settings, traffic_light_settings = get_latest_settings()
+        assert spawn_rates["east"] == {"forward": 7, "left": 7, "right": 7}
+        assert junction_settings["lanes"] == 4
+        assert traffic_light_settings["sequences_per_hour"] == 12
+
+def test_process_csv(client):
+    dummy_file = configuration_csv_file(
+        "10,5,5,3,2,4,4,1,6,2,3,7,3,4",
+        "20,6,1,1,1,2,2,2,3,3,3,4,4,4",
     )
-    class DummyFile:
-        def __init__(self, content):
-            self.stream = io.BytesIO(content.encode("utf-8"))
-    dummy_file = DummyFile(csv_content)
-    configs = process_csv(dummy_file)
-    assert len(configs) == 1
-    config = configs[0]
-    assert config.pedestrian_duration == "10"
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        inserted = process_csv(dummy_file, s.id)
+        assert inserted == 2
+        stored = Configuration.query.filter_by(session_id=s.id).order_by(Configuration.run_id).all()
+        assert len(stored) == 2
+        assert stored[0].pedestrian_duration == 10
+        assert stored[0].north_vph == 10
+        assert stored[1].pedestrian_duration == 20
+        assert stored[1].west_vph == 12
+        assert stored[0].lanes == 5
+
+def test_process_csv_skips_blank_lines(client):
+    dummy_file = configuration_csv_file(
+        "10,5,5,3,2,4,4,1,6,2,3,7,3,4",
+        "",
+        "20,6,1,1,1,2,2,2,3,3,3,4,4,4",
+        "",
+    )
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        assert process_csv(dummy_file, s.id) == 2
+        assert Configuration.query.filter_by(session_id=s.id).count() == 2
+
+def test_process_csv_rolls_back_on_bad_row(client):
+    dummy_file = configuration_csv_file(
+        "10,5,5,3,2,4,4,1,6,2,3,7,3,4",
+        "10,5,x,3,2,4,4,1,6,2,3,7,3,4",
+    )
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        with pytest.raises(ValueError):
+            process_csv(dummy_file, s.id)
+        assert Configuration.query.filter_by(session_id=s.id).count() == 0
+
+def test_save_leaderboard_results_bulk(client):
+    metrics = {
+        "avg_wait_time_n": 10, "max_wait_time_n": 15, "max_queue_length_n": 5,
+        "avg_wait_time_s": 11, "max_wait_time_s": 16, "max_queue_length_s": 6,
+        "avg_wait_time_e": 12, "max_wait_time_e": 17, "max_queue_length_e": 7,
+        "avg_wait_time_w": 13, "max_wait_time_w": 18, "max_queue_length_w": 8
+    }
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1))
+        db.session.add(create_full_configuration(session_id=s.id, run_id=2))
+        db.session.commit()
+        rows = [build_leaderboard_row(run_id, s.id, metrics) for run_id in (1, 2)]
+        assert rows[0]["max_queue_length_west"] == 8
+        save_leaderboard_results_bulk(LeaderboardResult, rows)
+        db.session.commit()
+        stored = LeaderboardResult.query.filter_by(session_id=s.id).all()
+        assert len(stored) == 2
+        assert stored[0].avg_wait_time_south == 11
+
+def test_get_session_leaderboard(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        for run_id in range(1, 13):
+            db.session.add(create_full_configuration(session_id=s.id, run_id=run_id, traffic=run_id))
+            db.session.add(LeaderboardResult(
+                session_id=s.id, run_id=run_id,
+                avg_wait_time_north=run_id % 5, max_wait_time_north=15, max_queue_length_north=5,
+                avg_wait_time_south=10, max_wait_time_south=run_id % 3, max_queue_length_south=5,
+                avg_wait_time_east=10, max_wait_time_east=15, max_queue_length_east=run_id % 4,
+                avg_wait_time_west=10, max_wait_time_west=15, max_queue_length_west=5
+            ))
+        db.session.commit()
+        top = get_session_leaderboard(s.id)
+        expected = sorted(
+            compute_score_4directions(
+                r.run_id, r.session_id,
+                r.avg_wait_time_north, r.max_wait_time_north, r.max_queue_length_north,
+                r.avg_wait_time_south, r.max_wait_time_south, r.max_queue_length_south,
+                r.avg_wait_time_east, r.max_wait_time_east, r.max_queue_length_east,
+                r.avg_wait_time_west, r.max_wait_time_west, r.max_queue_length_west
+            )
+            for r in LeaderboardResult.query.filter_by(session_id=s.id)
+        )[:10]
+        assert len(top) == 10
+        assert [r.calculated_score for r in top] == pytest.approx(expected)
+        assert get_session_leaderboard(s.id + 1) == []
+
+def test_get_configuration_volumes(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1, traffic=2))
+        db.session.add(create_full_configuration(session_id=s.id, run_id=2, traffic=5))
+        db.session.commit()
+        volumes = get_configuration_volumes([1, 2, 2, 3])
+        assert volumes == {(1, s.id): (6, 6, 6, 6), (2, s.id): (15, 15, 15, 15)}
+        metrics = (4, 8, 2) * 4
+        assert compute_score_4directions(2, s.id, *metrics, volumes=volumes[(2, s.id)]) == \
+            pytest.approx(compute_score_4directions(2, s.id, *metrics))
+
+def test_get_run_volumes_caches_found_runs_per_context(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        sid = s.id
+        with pytest.raises(ValueError):
+            get_run_volumes(1, sid)
+        db.session.add(create_full_configuration(session_id=sid, run_id=1, traffic=4))
+        db.session.commit()
+        assert get_run_volumes(1, sid) == (12, 12, 12, 12)
+        Configuration.query.filter_by(run_id=1).update({"north_forward_vph": 10})
+        db.session.commit()
+        assert get_run_volumes(1, sid) == (12, 12, 12, 12)
+    # A later request reads the stored configuration again
+    with app.app_context():
+        assert get_run_volumes(1, sid) == (18, 12, 12, 12)
+
+def test_score_results_matches_compute_score(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        results = []
+        for run_id, traffic in ((1, 0), (2, 3), (3, 8)):
+            db.session.add(create_full_configuration(session_id=s.id, run_id=run_id, traffic=traffic))
+            results.append(LeaderboardResult(
+                session_id=s.id, run_id=run_id,
+                avg_wait_time_north=run_id, max_wait_time_north=15, max_queue_length_north=5,
+                avg_wait_time_south=10, max_wait_time_south=run_id * 2, max_queue_length_south=5,
+                avg_wait_time_east=10, max_wait_time_east=15, max_queue_length_east=run_id,
+                avg_wait_time_west=7.5, max_wait_time_west=15, max_queue_length_west=5
+            ))
+        db.session.add_all(results)
+        db.session.commit()
+        volumes = get_configuration_volumes(r.run_id for r in results)
+        expected = [
+            compute_score_4directions(r.run_id, r.session_id, *(getattr(r, c) for c in (
+                "avg_wait_time_north", "max_wait_time_north", "max_queue_length_north",
+                "avg_wait_time_south", "max_wait_time_south", "max_queue_length_south",
+                "avg_wait_time_east", "max_wait_time_east", "max_queue_length_east",
+                "avg_wait_time_west", "max_wait_time_west", "max_queue_length_west")))
+            for r in results
+        ]
+        assert score_results(results, volumes) == pytest.approx(expected)
+        assert expected[0] == 0
+        assert score_results([], volumes) == []
+        with pytest.raises(ValueError):
+            score_results(results, {})
+
+def test_leaderboard_session_run_index(client):
+    with app.app_context():
+        indexes = inspect(db.engine).get_indexes("leaderboard_results")
+        assert {"name": "idx_lbr_session_run", "column_names": ["session_id", "run_id"]} in [
+            {"name": i["name"], "column_names": i["column_names"]} for i in indexes
+        ]
+
+def test_algorithm_leaderboard_session_run_index(client):
+    with app.app_context():
+        indexes = {i["name"]: i["column_names"]
+                   for i in inspect(db.engine).get_indexes("algorithm_leaderboard_results")}
+        assert indexes["idx_alg_session_run"] == ["session_id", "run_id"]
+        plan = db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT * FROM algorithm_leaderboard_results WHERE run_id = 1 AND session_id = 1"
+        )).fetchall()
+        assert "idx_alg_session_run" in " ".join(str(step[-1]) for step in plan)
+
+def test_configuration_and_traffic_settings_indexes(client):
+    with app.app_context():
+        inspector = inspect(db.engine)
+        config_indexes = {i["name"]: i["column_names"] for i in inspector.get_indexes("configurations")}
+        ts_indexes = {i["name"]: i["column_names"] for i in inspector.get_indexes("traffic_settings")}
+        assert config_indexes["idx_config_session"] == ["session_id"]
+        assert ts_indexes["idx_ts_run_session"] == ["run_id", "session_id"]
+        plan = db.session.execute(
+            db.text("EXPLAIN QUERY PLAN SELECT * FROM traffic_settings WHERE run_id = 1")
+        ).fetchall()
+        assert "idx_ts_run_session" in " ".join(str(step[-1]) for step in plan)
+
+def test_init_db_command_restores_missing_index(client):
+    with app.app_context():
+        db.session.execute(db.text("DROP INDEX idx_config_session"))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=["init-db"])
+    assert result.exit_code == 0
+    with app.app_context():
+        names = {i["name"] for i in inspect(db.engine).get_indexes("configurations")}
+        assert "idx_config_session" in names
+
+def test_sqlite_pragmas(client):
+    with app.app_context():
+        assert db.session.execute("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert db.session.execute("PRAGMA cache_size").scalar() == -65536
 
 # =========================
 # Session and Index Endpoints Tests
@@ -169,12 +638,79 @@ def test_end_session_api(client):
     assert response.status_code == 200
     assert data["message"] == "Session ended"
 
+def test_get_active_session_id_follows_create_and_end(client):
+    with app.app_context():
+        first = create_session()
+        assert get_active_session_id() == first
+        second = create_session()
+        assert get_active_session_id() == second
+        end_session(second)
+        assert get_active_session_id() == first
+
+def test_get_active_session_id_expires(client, monkeypatch):
+    with app.app_context():
+        first = create_session()
+        assert get_active_session_id() == first
+        # A session created by another worker bypasses this process's cache
+        other = Session()
+        db.session.add(other)
+        db.session.commit()
+        assert get_active_session_id() == first
+        expired = time.monotonic() + 2
+        monkeypatch.setattr("app.time.monotonic", lambda: expired)
+        assert get_active_session_id() == other.id
+
+def test_serve_frontend_caching(client):
+    response = client.get("/frontend/config.js")
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 300
+    assert response.cache_control.public
+    revalidated = client.get("/frontend/config.js",
+                             headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert revalidated.status_code == 304
+
 def test_index_and_indexTwo(client):
     response1 = client.get("/")
     response2 = client.get("/index")
     assert response1.status_code == 200
     assert response2.status_code == 200
 
+def test_index_reuses_session_until_it_has_runs(client):
+    with app.app_context():
+        sessions_before = Session.query.count()
+    client.get("/")
+    client.get("/index")
+    with app.app_context():
+        assert Session.query.count() == sessions_before + 1
+        latest = Session.query.order_by(Session.id.desc()).first()
+        db.session.add(create_full_configuration(session_id=latest.id, run_id=1))
+        db.session.commit()
+    client.get("/index")
+    with app.app_context():
+        assert Session.query.count() == sessions_before + 2
+
+def test_index_gives_each_browser_its_own_session(client):
+    client.get("/")
+    with client.session_transaction() as cookie:
+        first = cookie["sid"]
+    with app.test_client() as other:
+        other.get("/")
+        with other.session_transaction() as cookie:
+            second = cookie["sid"]
+    assert second != first
+
+def test_index_reuses_the_browsers_own_session(client):
+    client.get("/")
+    with client.session_transaction() as cookie:
+        own_session = cookie["sid"]
+    with app.app_context():
+        # Another visitor starting a newer session must not take this browser's place
+        newer_session = create_session()
+    client.get("/index")
+    with client.session_transaction() as cookie:
+        assert cookie["sid"] == own_session
+    assert newer_session != own_session
+
 def test_get_session_run_id_endpoint(client):
     with app.app_context():
         s = Session(active=True)
@@ -202,7 +738,7 @@ def test_results_endpoint(client, monkeypatch):
         config = create_full_configuration(session_id=s.id, run_id=1)
         db.session.add(config)
         db.session.commit()
-    dummy_sim = lambda: (jsonify({
+    dummy_sim = lambda session_id, run_id: {
         "user": {
             "avg_wait_time_n": 10, "max_wait_time_n": 15, "max_queue_length_n": 5,
             "avg_wait_time_s": 10, "max_wait_time_s": 15, "max_queue_length_s": 5,
@@ -217,8 +753,8 @@ def test_results_endpoint(client, monkeypatch):
             "avg_wait_time_w": 12, "max_wait_time_w": 18, "max_queue_length_w": 6,
             "score": 1.5
         }
-    }), 200)
-    monkeypatch.setattr("app.simulate", dummy_sim)
+    }
+    monkeypatch.setattr("app.run_simulation", dummy_sim)
     with app.app_context():
         s2 = create_session()
         app.global_session_id = s2
@@ -268,7 +804,7 @@ def test_simulate_endpoint(client, monkeypatch):
             }
         }
         return DummyResponse(data, 200)
-    monkeypatch.setattr("app.requests.get", dummy_requests_get)
+    monkeypatch.setattr("app.http_session.get", dummy_requests_get)
     with app.app_context():
         s = Session()
         db.session.add(s)
@@ -284,6 +820,75 @@ def test_simulate_endpoint(client, monkeypatch):
     assert "message" in data
     assert "user" in data
     assert "default" in data
+    with app.app_context():
+        assert LeaderboardResult.query.filter_by(run_id=1).count() == 1
+        assert AlgorithmLeaderboardResult.query.filter_by(run_id=1).count() == 1
+
+def test_simulate_async_reports_result(client, monkeypatch):
+    monkeypatch.setattr("app.run_simulation", lambda session_id, run_id: {"run_id": run_id, "session_id": session_id})
+    response = client.post("/simulate_async", json={"run_id": 3, "session_id": 7})
+    assert response.status_code == 202
+    task = response.get_json()
+    simulation_tasks[task["task_id"]].result(timeout=5)
+    status = client.get(task["status_url"])
+    assert status.status_code == 200
+    assert status.get_json() == {"status": "done", "result": {"run_id": 3, "session_id": 7}}
+
+def test_simulate_async_reports_failure(client, monkeypatch):
+    def failing_simulation(session_id, run_id):
+        raise ValueError("Configuration not found")
+    monkeypatch.setattr("app.run_simulation", failing_simulation)
+    task = client.post("/simulate_async", json={"run_id": 1, "session_id": 1}).get_json()
+    with pytest.raises(ValueError):
+        simulation_tasks[task["task_id"]].result(timeout=5)
+    status = client.get(task["status_url"]).get_json()
+    assert status["status"] == "failed"
+    assert "Configuration not found" in status["error"]
+    assert client.get("/simulate_status/unknown").status_code == 404
+
+def test_simulate_async_rejects_missing_ids(client, monkeypatch):
+    queued = []
+    monkeypatch.setattr("app.run_simulation", lambda session_id, run_id: queued.append(run_id))
+    with simulation_tasks_lock:
+        tasks_before = len(simulation_tasks)
+    assert client.post("/simulate_async", json={"run_id": 1}).status_code == 400
+    assert client.post("/simulate_async", json={"session_id": 1}).status_code == 400
+    assert client.post("/simulate_async", data="run_id=1", content_type="text/plain").status_code == 400
+    assert client.post("/simulate_async", json=[1, 2]).status_code == 400
+    with simulation_tasks_lock:
+        assert len(simulation_tasks) == tasks_before
+    assert queued == []
+
+def test_run_simulation_holds_simulation_lock(client, monkeypatch):
+    held = []
+    def dummy_get(url, timeout=None):
+        held.append(simulation_lock.locked())
+        raise RuntimeError("simulator unavailable")
+    monkeypatch.setattr("app.http_session.get", dummy_get)
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            run_simulation(1, 1)
+    assert held == [True]
+    assert not simulation_lock.locked()
+
+def test_send_settings_to_server_posts_one_json_payload(monkeypatch):
+    posted = []
+    def dummy_post(url, timeout=None, data=None, json=None, headers=None):
+        posted.append((url, data, json, headers))
+        return DummyResponse({}, 200)
+    monkeypatch.setattr("app.http_session.post", dummy_post)
+    send_settings_to_server({"north": {"forward": 1}}, {"lanes": 3}, {"sequences": 2})
+    assert len(posted) == 1
+    url, data, json_arg, headers = posted[0]
+    assert url.endswith("/update_all_settings")
+    body = json_arg if data is None else json.loads(data)
+    assert body == {
+        "spawn_rates": {"north": {"forward": 1}},
+        "junction_settings": {"lanes": 3},
+        "traffic_light_settings": {"sequences": 2},
+    }
+    if data is not None:
+        assert headers["Content-Type"] == "application/json"
 
 def test_junction_details_endpoint(client):
     with app.app_context():
@@ -312,6 +917,19 @@ def test_junction_details_endpoint(client):
     response = client.get("/junction_details" + query_string, follow_redirects=True)
     assert response.status_code == 200
 
+def test_junction_details_without_settings_or_results(client):
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        db.session.add(create_full_configuration(session_id=s.id, run_id=1))
+        db.session.commit()
+        sid = s.id
+    response = client.get(f"/junction_details?session_id={sid}&run_id=1")
+    assert response.status_code == 200
+    missing = client.get(f"/junction_details?session_id={sid}&run_id=2")
+    assert missing.status_code == 302
+
 # =========================
 # Parameters, Upload, and Proxy Endpoints Tests
 # =========================
@@ -322,7 +940,7 @@ def test_parameters_get(client):
 
 def test_junction_settings_proxy(client, monkeypatch):
     dummy_data = {"lanes": 3, "pedestrian_duration": 10, "pedestrian_frequency": 5}
-    monkeypatch.setattr("app.requests.get", lambda url: DummyResponse(dummy_data, 200))
+    monkeypatch.setattr("app.http_session.get", lambda url, **kwargs: DummyResponse(dummy_data, 200))
     response = client.get("/junction_settings_proxy")
     data = response.get_json()
     assert response.status_code == 200
@@ -373,6 +991,67 @@ def test_leaderboards_page(client):
     response = client.get("/leaderboards")
     assert response.status_code == 200
 
+def test_get_all_time_best_configurations(client):
+    def metrics(base):
+        return dict(
+            avg_wait_time_north=base, max_wait_time_north=base + 5, max_queue_length_north=3,
+            avg_wait_time_south=base, max_wait_time_south=base + 5, max_queue_length_south=4,
+            avg_wait_time_east=base, max_wait_time_east=base + 5, max_queue_length_east=5,
+            avg_wait_time_west=base, max_wait_time_west=base + 5, max_queue_length_west=6
+        )
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        for run_id, enabled in ((1, True), (2, True), (3, False)):
+            db.session.add(create_full_configuration(session_id=s.id, run_id=run_id, traffic=run_id))
+            db.session.add(LeaderboardResult(session_id=s.id, run_id=run_id, **metrics(10)))
+            db.session.add(AlgorithmLeaderboardResult(session_id=s.id, run_id=run_id, **metrics(20)))
+            db.session.add(TrafficSettings(run_id=run_id, session_id=s.id, enabled=enabled))
+        db.session.commit()
+        best = get_all_time_best_configurations()
+        assert [entry["run_id"] for entry in best] == [1, 2]
+        for entry in best:
+            user = compute_score_4directions(entry["run_id"], s.id, *metrics(10).values())
+            algorithm = compute_score_4directions(entry["run_id"], s.id, *metrics(20).values())
+            assert entry["user_score"] == pytest.approx(user)
+            assert entry["score_difference"] == pytest.approx(algorithm - user)
+            assert entry["max_queue_length_west"] == 6
+        cached = get_cached_all_time_best_configurations()
+        assert cached == best
+        assert get_cached_all_time_best_configurations() is cached
+        # A new result changes the key and rebuilds the leaderboard
+        db.session.add(create_full_configuration(session_id=s.id, run_id=4, traffic=1))
+        db.session.add(LeaderboardResult(session_id=s.id, run_id=4, **metrics(1)))
+        db.session.add(AlgorithmLeaderboardResult(session_id=s.id, run_id=4, **metrics(30)))
+        db.session.add(TrafficSettings(run_id=4, session_id=s.id, enabled=True))
+        db.session.commit()
+        assert get_cached_all_time_best_configurations()[0]["run_id"] == 4
+
+def test_get_recent_runs_with_scores_pairs_results_by_run(client):
+    def metrics(base):
+        return {column: base for column in (
+            "avg_wait_time_north", "max_wait_time_north", "max_queue_length_north",
+            "avg_wait_time_south", "max_wait_time_south", "max_queue_length_south",
+            "avg_wait_time_east", "max_wait_time_east", "max_queue_length_east",
+            "avg_wait_time_west", "max_wait_time_west", "max_queue_length_west",
+        )}
+    with app.app_context():
+        s = Session()
+        db.session.add(s)
+        db.session.commit()
+        for run_id in (1, 2, 3):
+            db.session.add(create_full_configuration(session_id=s.id, run_id=run_id))
+            db.session.add(TrafficSettings(run_id=run_id, session_id=s.id, enabled=True))
+            db.session.add(LeaderboardResult(session_id=s.id, run_id=run_id, **metrics(10)))
+        # Run 2 has no algorithm result, so it must not be paired with another run's
+        for run_id, base in ((1, 40), (3, 20)):
+            db.session.add(AlgorithmLeaderboardResult(session_id=s.id, run_id=run_id, **metrics(base)))
+        db.session.commit()
+        runs = get_recent_runs_with_scores(s.id)
+        assert [run["run_id"] for run in runs] == [1, 3]
+        assert runs[0]["score"] > runs[1]["score"] > 0
+
 def test_session_leaderboard_page(client):
     response = client.get("/session_leaderboard?session_id=1")
     assert response.status_code == 200
@@ -413,10 +1092,20 @@ def test_download_metrics_json_endpoint(client):
         )
         db.session.add_all([lb, algo, ts])
         db.session.commit()
+        expected_user = compute_score_4directions(1, s.id, *(10, 15, 5) * 4)
+        expected_algo = compute_score_4directions(1, s.id, *(12, 18, 6) * 4)
     response = client.get("/download_metrics_json")
     assert response.status_code == 200
     content_disp = response.headers.get("Content-Disposition")
     assert "attachment;filename=metrics.json" in content_disp
+    assert response.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(records) == 1
+    record = records[0]
+    assert record["run_id"] == 1
+    assert record["user_score"] == pytest.approx(expected_user)
+    assert record["algo_score"] == pytest.approx(expected_algo)
+    assert record["score_diff"] == pytest.approx(record["algo_score"] - record["user_score"])
 
 def test_loading_page(client):
     response = client.get("/loading")